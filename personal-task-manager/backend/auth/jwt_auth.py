@@ -1,34 +1,94 @@
 from datetime import datetime, timedelta, timezone
+from typing import Annotated
+from uuid import uuid4
 import jwt
+import logging
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
 from models.my_config import get_settings
+from services.role_cache import role_cache
+from services.token_cache import token_cache
+from services.token_denylist import token_denylist
+
+logger = logging.getLogger(__name__)
 
 
 # Follow these naming conventions for token stuff \/
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     username: str
     exp_datetime: datetime
+    role: str | None = None  # as of sign-in; require_admin re-checks it
+    jti: str | None = None
+    family: str | None = None  # shared by every token issued from one sign-in
+    token_type: str = "access"  # access | refresh | events
 
 
 ALGORITHM = "HS256"
 
 
-def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=60)):
+def create_access_token(data: dict, expires_delta: timedelta | None = None):
     payload = data.copy()
+    if expires_delta is None:
+        expires_delta = timedelta(minutes=get_settings().access_token_expire_minutes)
     # if we have anything for expires_delta, set the expire time to be now + delta
     expire = datetime.now(timezone.utc) + expires_delta
-    payload.update({"exp": expire})
+    payload.update({"exp": expire, "jti": uuid4().hex, "type": "access"})
     key = get_settings().secret_key
     encoded = jwt.encode(payload, key, algorithm=ALGORITHM)
     return encoded
 
 
+def create_refresh_token(username: str, family: str):
+    expire = datetime.now(timezone.utc) + refresh_token_lifetime()
+    payload = {
+        "username": username,
+        "fam": family,
+        "exp": expire,
+        "jti": uuid4().hex,
+        "type": "refresh",
+    }
+    key = get_settings().secret_key
+    return jwt.encode(payload, key, algorithm=ALGORITHM)
+
+
+# Short-lived token that only opens the /events stream. EventSource can't send
+# an Authorization header, so it travels in the query string instead, where
+# proxies may log it; hence the narrow scope and short lifetime.
+def create_events_token(current_user: TokenData) -> str:
+    expire = datetime.now(timezone.utc) + timedelta(
+        seconds=get_settings().events_token_expire_seconds
+    )
+    payload = {
+        "username": current_user.username,
+        "fam": current_user.family,
+        "exp": expire,
+        "jti": uuid4().hex,
+        "type": "events",
+    }
+    key = get_settings().secret_key
+    return jwt.encode(payload, key, algorithm=ALGORITHM)
+
+
+def refresh_token_lifetime() -> timedelta:
+    return timedelta(days=get_settings().refresh_token_expire_days)
+
+
+def new_token_family() -> str:
+    return uuid4().hex
+
+
 # Takes token (presumably from the frontend, and reads to our python class TokenData)
 def decode_jwt_token(token: str) -> TokenData | None:
     try:
@@ -36,6 +96,96 @@ def decode_jwt_token(token: str) -> TokenData | None:
         payload = jwt.decode(token, key, algorithms=[ALGORITHM])
         username: str = payload.get("username")
         exp: int = payload.get("exp")
-        return TokenData(username=username, exp_datetime=datetime.fromtimestamp(exp))
-    except jwt.InvalidTokenError:
-        print("Invalid JWT Token.")
+        return TokenData(
+            username=username,
+            exp_datetime=datetime.fromtimestamp(exp),
+            role=payload.get("role"),
+            jti=payload.get("jti"),
+            family=payload.get("fam"),
+            token_type=payload.get("type", "access"),
+        )
+    except jwt.InvalidTokenError as e:
+        # Callers log the rejection; this only says why
+        logger.debug(f"Invalid JWT token: {str(e)}")
+        return None
+
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/sign-in")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="users/sign-in", auto_error=False
+)
+
+
+# Route dependency for the signed-in user (routers import it via routers.user_router)
+# async so it runs on the event loop: a plain def would be run in the threadpool,
+# where concurrent calls would race on token_cache
+async def get_user(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+    # Tokens already verified are served from the cache until they expire
+    token_data = token_cache.get(token)
+    if not token_data:
+        token_data = decode_jwt_token(token)
+        if token_data and token_data.token_type == "access":
+            token_cache.set(token, token_data.exp_datetime.timestamp(), token_data)
+
+    if (
+        not token_data
+        or token_data.token_type != "access"
+        or token_denylist.is_revoked(token_data.jti, token_data.family)
+    ):
+        logger.warning("Invalid token, token expired or revoked")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+
+# Route dependency for /events: an events token in ?token= (browsers'
+# EventSource), or else the usual bearer access token
+async def get_events_user(
+    bearer: Annotated[str | None, Depends(optional_oauth2_scheme)],
+    token: Annotated[str | None, Query()] = None,
+) -> TokenData:
+    if token is None:
+        if bearer is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return await get_user(bearer)
+
+    token_data = decode_jwt_token(token)
+    if (
+        not token_data
+        or token_data.token_type != "events"
+        or token_denylist.is_revoked(token_data.jti, token_data.family)
+    ):
+        logger.warning("Invalid events token, token expired or revoked")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+    return token_data
+
+
+# Route dependency for admin-only endpoints. A token signed for a non-admin is
+# turned away without a lookup; an admin claim is confirmed against the cached
+# current role, so demotions and deletions apply before the token expires.
+async def require_admin(
+    current_user: Annotated[TokenData, Depends(get_user)],
+) -> TokenData:
+    if current_user.role in (None, "admin"):
+        role = await role_cache.get(current_user.username)
+    else:
+        role = current_user.role
+    if role != "admin":
+        logger.warning(
+            f"User {current_user.username} attempted to access an admin endpoint without permission"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
@@ -0,0 +1,49 @@
+# BACKFILL SEARCH EXCERPTS OF LARGE DESCRIPTIONS
+#
+# Tasks whose description was moved to task_descriptions before excerpts were
+# kept inline have description="" and are invisible to /todos/search. This
+# copies the excerpt (the first description_search_excerpt_bytes) back onto
+# them, in tasks and tasks_archive. Safe to run more than once.
+#
+#   python backfill_description_excerpts.py
+
+import asyncio
+import zlib
+
+import certifi
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from models.my_config import get_settings
+
+BATCH_SIZE = 100
+
+
+async def main():
+    settings = get_settings()
+    excerpt_bytes = min(
+        settings.description_search_excerpt_bytes,
+        settings.description_inline_max_bytes,
+    )
+    client = AsyncIOMotorClient(settings.connection_string, tlsCAFile=certifi.where())
+    db = client["gottaDo_app"]
+
+    for collection in ("tasks", "tasks_archive"):
+        updated = 0
+        cursor = db[collection].find(
+            {"description_external": True, "description": ""}, projection={"_id": 1}
+        )
+        while batch := await cursor.to_list(BATCH_SIZE):
+            ids = [task["_id"] for task in batch]
+            async for stored in db.task_descriptions.find({"_id": {"$in": ids}}):
+                raw = zlib.decompress(stored["data"])
+                excerpt = raw[:excerpt_bytes].decode(errors="ignore")
+                await db[collection].update_one(
+                    {"_id": stored["_id"], "description": ""},
+                    {"$set": {"description": excerpt}},
+                )
+                updated += 1
+        print(f"{collection}: {updated} excerpts backfilled")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+# BCRYPT COST CALIBRATION
+#
+# Measures how long one bcrypt hash takes on this host for a range of cost
+# factors and recommends the highest one that stays within a time budget.
+# Run it on the machine (or instance type) that serves the API:
+#
+#   python calibrate_bcrypt.py --target-ms 250
+#
+# then put the recommendation in .env as BCRYPT_ROUNDS. Existing hashes are
+# moved to the new cost as their users sign in.
+
+import argparse
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+SAMPLE_PASSWORD = "correct horse battery staple"
+
+
+def measure(rounds: int, samples: int) -> float:
+    """Median milliseconds for one hash at the given cost"""
+    hasher = bcrypt.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost for this host")
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250,
+        help="longest acceptable time for one hash (default 250)",
+    )
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=15)
+    parser.add_argument(
+        "--samples", type=int, default=5, help="hashes timed per cost (default 5)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="password_hash_workers, for the throughput estimate (default 4)",
+    )
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'ms/hash':>10} {'sign-ins/s':>11}")
+    recommended = None
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        ms = measure(rounds, args.samples)
+        print(f"{rounds:>6} {ms:>10.1f} {args.workers * 1000 / ms:>11.1f}")
+        if ms > args.target_ms:
+            # Each extra round doubles the time; no point measuring further
+            break
+        recommended = rounds
+
+    if recommended is None:
+        print(
+            f"\nEven {args.min_rounds} rounds take longer than {args.target_ms:.0f} ms;"
+            " raise --target-ms or use faster hardware."
+        )
+        return
+    print(
+        f"\nRecommended: BCRYPT_ROUNDS={recommended}"
+        f" (highest cost within {args.target_ms:.0f} ms per hash)"
+    )
+
+
+if __name__ == "__main__":
+    main()
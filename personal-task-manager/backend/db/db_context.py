@@ -1,11 +1,15 @@
 from beanie import init_beanie
 
 from models.my_config import get_settings
-from models.task import Task
+from models.task import ArchivedTask, Task, TaskDescription
+from models.task_counters import TaskCounters
 from models.user import User
 from models.log import Log
 from models.file import File
 from models.ofx_file import OFXFile, Transaction
+from models.revoked_token import RevokedToken
+
+from db.index_report import report_index_coverage
 
 from motor.motor_asyncio import AsyncIOMotorClient
 import certifi
@@ -22,5 +26,23 @@ async def init_database():
     # Use the SSL context in the MongoDB client
     client = AsyncIOMotorClient(my_config.connection_string, tlsCAFile=certifi.where())
     db = client["gottaDo_app"]
-    await init_beanie(database=db, document_models=[User, Task, Log, File, OFXFile, Transaction])
+    # init_beanie also creates the indexes declared in each model's Settings.
+    # It never drops any; superseded indexes are removed by
+    # drop_superseded_indexes.py once a release no longer needs them.
+    await init_beanie(
+        database=db,
+        document_models=[
+            User,
+            Task,
+            ArchivedTask,
+            TaskCounters,
+            TaskDescription,
+            Log,
+            File,
+            OFXFile,
+            Transaction,
+            RevokedToken,
+        ],
+    )
     logger.info("database started")
+    await report_index_coverage()
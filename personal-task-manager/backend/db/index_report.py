@@ -0,0 +1,218 @@
+# STARTUP INDEX COVERAGE REPORT
+#
+# Every query the routers send to MongoDB is listed here by shape: the fields
+# it matches on with equality, then the fields it sorts or range-filters on.
+# At startup each shape is checked against the indexes that actually exist in
+# the database, and any shape without a usable index is logged as a warning.
+# Add a shape here whenever a router gains a new query.
+
+import logging
+from typing import NamedTuple
+
+from beanie import Document
+
+from models.task import ArchivedTask, Task, TaskDescription
+from models.task_counters import TaskCounters
+from models.user import User
+from models.log import Log
+from models.file import File
+from models.ofx_file import OFXFile, Transaction
+from models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class QueryShape(NamedTuple):
+    model: type[Document]
+    source: str  # router function(s) issuing the query
+    equality: tuple[str, ...]  # fields matched with ==
+    ordered: tuple[str, ...] = ()  # sort / range fields, in order
+    residual: tuple[str, ...] = ()  # equality fields deliberately left to filtering
+
+
+QUERY_SHAPES: list[QueryShape] = [
+    # task_router
+    QueryShape(
+        Task,
+        "task_router.get_all",
+        ("username", "completed"),
+        ("created_date", "_id"),
+    ),
+    QueryShape(
+        Task,
+        "task_router.get_tasks / get_todos / get_gottados",
+        ("username", "level", "completed"),
+        ("created_date", "_id"),
+    ),
+    QueryShape(
+        Task,
+        "task_router.get_all (tag filter)",
+        ("username", "tags", "completed"),
+        ("created_date", "_id"),
+    ),
+    QueryShape(
+        Task,
+        "task_router.get_tasks / get_todos / get_gottados (tag filter)",
+        ("username", "tags", "level", "completed"),
+        ("created_date", "_id"),
+        residual=("level",),
+    ),
+    QueryShape(
+        Task,
+        "task_router.get_board",
+        ("username", "completed"),
+        ("expired_date", "_id"),
+    ),
+    QueryShape(
+        Task,
+        "task_router.get_completed",
+        ("username", "completed"),
+        ("completed_date", "_id"),
+    ),
+    QueryShape(
+        Task,
+        "task_router.get_completed (tag filter)",
+        ("username", "tags", "completed"),
+        ("completed_date", "_id"),
+    ),
+    QueryShape(Task, "task_router.get_tags / export_tasks", ("username",)),
+    QueryShape(ArchivedTask, "task_router.get_tags / export_tasks", ("username",)),
+    # A text index stores its terms under the "_fts" key
+    QueryShape(Task, "task_router.search_tasks", ("username",), ("_fts",)),
+    QueryShape(ArchivedTask, "task_router.search_tasks", ("username",), ("_fts",)),
+    # services
+    QueryShape(
+        Task,
+        "expiry_scheduler.sweep",
+        ("completed", "level"),
+        ("expired_date",),
+    ),
+    QueryShape(Task, "task_archiver.sweep", ("completed",), ("completed_date",)),
+    QueryShape(
+        TaskCounters,
+        "task_router.get_task_stats / task_counters.increment",
+        ("username",),
+    ),
+    QueryShape(TaskCounters, "task_counters.reconcile_all", (), ("_id",)),
+    QueryShape(Task, "task_counters.reconcile (open)", ("username", "completed")),
+    QueryShape(
+        Task,
+        "task_counters.reconcile (completed this week)",
+        ("username", "completed"),
+        ("completed_date",),
+    ),
+    QueryShape(
+        ArchivedTask,
+        "task_counters.reconcile (completed this week, archived)",
+        ("username", "completed"),
+        ("completed_date",),
+        residual=("completed",),
+    ),
+    QueryShape(
+        ArchivedTask,
+        "task_router.get_completed (archived history)",
+        ("username",),
+        ("completed_date", "_id"),
+    ),
+    QueryShape(
+        ArchivedTask,
+        "task_router.get_completed (archived history, tag filter)",
+        ("username", "tags"),
+        ("completed_date", "_id"),
+    ),
+    # Removing a deleted user's data, and finding users that are gone
+    *[
+        QueryShape(model, "garbage_collector (user data)", ("username",))
+        for model in (
+            Task,
+            ArchivedTask,
+            TaskDescription,
+            TaskCounters,
+            File,
+            OFXFile,
+            Transaction,
+            Log,
+        )
+    ],
+    # file_router
+    QueryShape(File, "file_router.get_all", ("username",), ("upload_date",)),
+    QueryShape(
+        File,
+        "file_router.get_files_by_task / garbage_collector (task files)",
+        ("task_id", "username"),
+    ),
+    QueryShape(File, "garbage_collector.sweep (task files)", ("task_id",)),
+    # log_router
+    QueryShape(Log, "log_router.get_all_logs", (), ("time",)),
+    QueryShape(Log, "log_router.get_user_logs / get_my_logs", ("username",), ("time",)),
+    # ofx_router
+    QueryShape(OFXFile, "ofx_router.get_ofx_files", ("username",), ("upload_date",)),
+    QueryShape(
+        Transaction,
+        "ofx_router.get_ofx_file / delete_ofx_file",
+        ("ofx_file_id",),
+        ("transaction_date",),
+    ),
+    QueryShape(
+        Transaction,
+        "ofx_router.get_transactions / get_spending_summary / get_multi_month_summary",
+        ("username", "transaction_type"),
+        ("transaction_date",),
+    ),
+    QueryShape(
+        Transaction,
+        "ofx_router.get_transactions (category filter)",
+        ("username", "category", "transaction_type"),
+        ("transaction_date",),
+    ),
+    # user_router
+    QueryShape(User, "user_router.sign_up / login_for_access_token", ("username",)),
+    QueryShape(User, "role_cache.get (require_admin)", ("username",)),
+    QueryShape(RevokedToken, "token_denylist.sync", (), ("revoked_at",)),
+]
+
+
+def index_supports(index_keys: list[str], shape: QueryShape) -> bool:
+    """True if an index with these keys (in order) can serve the query shape.
+
+    The equality fields (minus any residual ones, which MongoDB filters while
+    walking the index) must make up the leading keys of the index in any
+    order, and the sort/range fields must follow them in order.
+    """
+    equality = set(shape.equality) - set(shape.residual)
+    eq_count = len(equality)
+    if set(index_keys[:eq_count]) != equality:
+        return False
+    following = index_keys[eq_count : eq_count + len(shape.ordered)]
+    return following == list(shape.ordered)
+
+
+async def report_index_coverage() -> list[QueryShape]:
+    """Log every router query shape that no existing index supports"""
+    index_keys_by_model: dict[type[Document], list[list[str]]] = {}
+    missing = []
+
+    for shape in QUERY_SHAPES:
+        if shape.model not in index_keys_by_model:
+            info = await shape.model.get_motor_collection().index_information()
+            index_keys_by_model[shape.model] = [
+                [field for field, _direction in index["key"]] for index in info.values()
+            ]
+
+        if not any(
+            index_supports(keys, shape) for keys in index_keys_by_model[shape.model]
+        ):
+            missing.append(shape)
+            logger.warning(
+                f"No index supports {shape.source} on "
+                f"{shape.model.get_collection_name()}: "
+                f"equality={list(shape.equality)} ordered={list(shape.ordered)}"
+            )
+
+    if missing:
+        logger.warning(
+            f"{len(missing)} of {len(QUERY_SHAPES)} query shapes lack index support"
+        )
+    else:
+        logger.info(f"All {len(QUERY_SHAPES)} query shapes are index-supported")
+    return missing
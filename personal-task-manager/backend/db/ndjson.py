@@ -0,0 +1,50 @@
+# NEWLINE-DELIMITED JSON STREAMING
+#
+# List endpoints normally load every matching document into memory before
+# FastAPI serializes the whole list. A client that sends
+# "Accept: application/x-ndjson" gets the documents streamed instead, one JSON
+# object per line, read from the Mongo cursor a batch at a time.
+
+from typing import Any, Awaitable, Callable, Optional
+
+from beanie.odm.queries.find import FindMany
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(
+    *queries: FindMany,
+    batch_size: int = 500,
+    lines_per_chunk: int = 100,
+    prepare: Optional[Callable[[list[Any]], Awaitable[None]]] = None,
+) -> StreamingResponse:
+    """Stream the results of one or more Beanie find queries (in order) as NDJSON.
+
+    `prepare` is awaited with each chunk of documents before it is serialized.
+    """
+    for query in queries:
+        query.pymongo_kwargs["batch_size"] = batch_size
+
+    async def dump(documents: list[Any]) -> str:
+        if prepare:
+            await prepare(documents)
+        return "\n".join(d.model_dump_json(by_alias=True) for d in documents) + "\n"
+
+    async def lines():
+        chunk = []
+        for query in queries:
+            async for document in query:
+                chunk.append(document)
+                if len(chunk) >= lines_per_chunk:
+                    yield await dump(chunk)
+                    chunk = []
+        if chunk:
+            yield await dump(chunk)
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
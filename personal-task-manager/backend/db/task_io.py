@@ -0,0 +1,161 @@
+# TASK IMPORT / EXPORT FORMATS
+#
+# Readers and writers for /todos/import and /todos/export. Uploads are read a
+# chunk of rows at a time (callers run next() in a worker thread, the upload
+# is a spooled temp file), and exports are written a chunk of tasks at a time,
+# so neither side ever holds the whole data set.
+#
+# Columns / keys are the TaskRequest fields. In CSV, tags are one
+# comma-separated cell and empty cells are left out (so defaults apply).
+# A JSON array is decoded one element at a time (_json_array), and NDJSON
+# lines are handed over undecoded so a bad line fails only its own row.
+
+import csv
+import io
+import json
+from typing import IO, Any, Iterator
+
+from models.task import TaskRequest
+
+TASK_IO_FIELDS = list(TaskRequest.model_fields)
+
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "json": "application/json"}
+
+
+def import_format(filename: str | None) -> str | None:
+    for suffix, name in IMPORT_FORMATS.items():
+        if filename and filename.lower().endswith(suffix):
+            return name
+    return None
+
+
+def read_rows(
+    upload: IO[bytes], format: str, chunk_size: int
+) -> Iterator[list[tuple[int, dict | str]]]:
+    """Yield (row number, raw row) lists of up to chunk_size rows.
+
+    A raw row is a dict, or for NDJSON the undecoded line (validate it with
+    TaskRequest.model_validate_json). Raises ValueError (or csv.Error) when
+    the upload can't be parsed any further, after yielding the rows before it.
+    """
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        rows = (_csv_row(row) for row in csv.DictReader(text))
+    elif format == "ndjson":
+        rows = (line for line in text if line.strip())
+    else:
+        rows = _json_array(text)
+
+    chunk = []
+    try:
+        for numbered in enumerate(rows, start=1):
+            chunk.append(numbered)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    except (ValueError, csv.Error):
+        # Hand over the rows read so far; the next call raises
+        if chunk:
+            yield chunk
+        raise
+    if chunk:
+        yield chunk
+
+
+def _json_array(text: IO[str], read_size: int = 65536) -> Iterator[Any]:
+    """The elements of a JSON array, decoded one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, position, eof
+        data = text.read(read_size)
+        eof = not data
+        buffer = buffer[position:] + data
+        position = 0
+        return not eof
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or not fill():
+                return
+
+    skip_whitespace()
+    if buffer[position : position + 1] != "[":
+        raise ValueError("Expected a JSON array of tasks")
+    position += 1
+    skip_whitespace()
+    if buffer[position : position + 1] == "]":
+        return
+
+    while True:
+        # An element may span reads; grow the buffer until it decodes
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+        position = end
+        yield element
+
+        skip_whitespace()
+        separator = buffer[position : position + 1]
+        position += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(
+                f"Expected ',' or ']' after array element, got {separator!r}"
+            )
+        skip_whitespace()
+
+
+def _csv_row(row: dict) -> dict:
+    values = {key: value for key, value in row.items() if key and value != ""}
+    if "tags" in values:
+        tags = (tag.strip() for tag in values["tags"].split(","))
+        values["tags"] = [tag for tag in tags if tag]
+    return values
+
+
+def task_record(task: Any) -> dict:
+    """The exported fields of a task, JSON-ready"""
+    return task.model_dump(include=set(TASK_IO_FIELDS), mode="json")
+
+
+def csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(TASK_IO_FIELDS)
+    return buffer.getvalue()
+
+
+def csv_lines(records: list[dict]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([_csv_value(record[field]) for field in TASK_IO_FIELDS])
+    return buffer.getvalue()
+
+
+def _csv_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ",".join(value)
+    return value
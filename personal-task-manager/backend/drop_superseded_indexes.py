@@ -0,0 +1,50 @@
+# DROP SUPERSEDED INDEXES
+#
+# The app creates the indexes its models declare at startup but never drops
+# any, so indexes added by hand (or by a newer build, during a rollback)
+# survive a restart. Indexes that a release replaced are listed here and
+# dropped explicitly, once the build that needed them is no longer deployed:
+#
+#   python drop_superseded_indexes.py            # show what would be dropped
+#   python drop_superseded_indexes.py --apply
+
+import argparse
+import asyncio
+
+import certifi
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from models.my_config import get_settings
+
+# collection -> index names that a newer index replaced
+SUPERSEDED = {
+    # Replaced by username_completed_level_created_date (keyset pagination)
+    "tasks": ["username_completed_level"],
+}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Drop superseded MongoDB indexes")
+    parser.add_argument(
+        "--apply", action="store_true", help="drop them (default: dry run)"
+    )
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(
+        get_settings().connection_string, tlsCAFile=certifi.where()
+    )
+    db = client["gottaDo_app"]
+    for collection, names in SUPERSEDED.items():
+        existing = await db[collection].index_information()
+        for name in names:
+            if name not in existing:
+                print(f"{collection}.{name}: not present")
+            elif args.apply:
+                await db[collection].drop_index(name)
+                print(f"{collection}.{name}: dropped")
+            else:
+                print(f"{collection}.{name}: would be dropped (pass --apply)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
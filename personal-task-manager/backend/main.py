@@ -7,6 +7,19 @@ from enum import Enum
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 from db.db_context import init_database
+from services.audit_writer import audit_writer
+from services.event_bus import event_bus
+from services.expiry_scheduler import expiry_scheduler
+from services.garbage_collector import garbage_collector
+from services.password_hasher import password_hasher
+from services.role_cache import role_cache
+from services.signin_limiter import signin_limiter
+from services.task_archiver import task_archiver
+from services.task_cache import task_cache
+from services.task_counters import task_counters
+from services.task_descriptions import task_descriptions
+from services.token_cache import token_cache
+from services.token_denylist import token_denylist
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -15,6 +28,7 @@ from routers.user_router import user_router
 from routers.file_router import file_router
 from routers.log_router import log_router
 from routers.ofx_router import ofx_router
+from routers.event_router import event_router
 
 from logging_setup import setup_logging
 
@@ -29,9 +43,30 @@ async def lifespan(app: FastAPI):
     # upon startup event
     logger.info("Application Starts...")
     await init_database()
+    task_cache.configure()
+    task_descriptions.configure()
+    password_hasher.start()
+    role_cache.configure()
+    signin_limiter.configure()
+    token_cache.configure()
+    await token_denylist.start()
+    await event_bus.start()
+    await audit_writer.start()
+    await expiry_scheduler.start()
+    await task_archiver.start()
+    await task_counters.start()
+    await garbage_collector.start()
     # on shutdown
     yield
-    logger.info("Application Shuts down")  # not currently implemented
+    await garbage_collector.stop()
+    await task_counters.stop()
+    await task_archiver.stop()
+    await expiry_scheduler.stop()
+    await audit_writer.stop()
+    await event_bus.stop()
+    await token_denylist.stop()
+    password_hasher.stop()
+    logger.info("Application Shuts down")
 
 
 app = FastAPI(Title="", version="2.0.0", lifespan=lifespan)
@@ -50,6 +85,7 @@ app.include_router(user_router, tags=["Users"], prefix="/users")
 app.include_router(file_router, tags=["Files"], prefix="/todos/files")
 app.include_router(log_router, tags=["Logs"], prefix="/logs")
 app.include_router(ofx_router, tags=["OFX"], prefix="/budget")
+app.include_router(event_router, tags=["Events"], prefix="/events")
 
 
 @app.get("/")
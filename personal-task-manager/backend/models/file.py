@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import Optional, Any, Dict
 from pydantic import BaseModel, Field
 from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 
 class File(Document):
@@ -18,6 +19,18 @@ class File(Document):
 
     class Settings:
         name = "files"
+        indexes = [
+            # A user's files, newest first
+            IndexModel(
+                [("username", ASCENDING), ("upload_date", DESCENDING)],
+                name="username_upload_date",
+            ),
+            # Files attached to a task
+            IndexModel(
+                [("task_id", ASCENDING), ("username", ASCENDING)],
+                name="task_id_username",
+            ),
+        ]
 
 
 class FileWithoutData(BaseModel):
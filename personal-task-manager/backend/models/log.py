@@ -1,6 +1,7 @@
 # MODEL FOR LOGGING
 
 from beanie import Document
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from datetime import datetime
 
 
@@ -12,3 +13,12 @@ class Log(Document):
 
     class Settings:
         name = "logs"
+        indexes = [
+            # Admin view of all logs, newest first
+            IndexModel([("time", DESCENDING)], name="time"),
+            # A single user's logs, newest first
+            IndexModel(
+                [("username", ASCENDING), ("time", DESCENDING)],
+                name="username_time",
+            ),
+        ]
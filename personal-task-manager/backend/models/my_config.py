@@ -5,6 +5,91 @@ class MyConfig(BaseSettings):
     connection_string : str
     secret_key : str
 
+    # Audit log writer (batched Log inserts)
+    audit_queue_size : int = 10000
+    audit_batch_size : int = 500
+    audit_flush_interval_ms : int = 50
+
+    # Expiry scheduler (promotes expired tasks to the next level)
+    expiry_sweep_interval_seconds : int = 60
+    expiry_sweep_batch_size : int = 500
+
+    # Per-user task list cache, bounded by entries and by tasks held in total
+    task_cache_max_entries : int = 1000
+    task_cache_max_items : int = 50000
+    task_cache_ttl_seconds : int = 30
+
+    # Archiver (moves old completed tasks to tasks_archive)
+    archive_after_days : int = 30
+    archive_interval_seconds : int = 3600
+    archive_batch_size : int = 500
+
+    # /events change notifications (Server-Sent Events)
+    events_change_streams : bool = True
+    events_max_streams_per_user : int = 5
+    events_coalesce_ms : int = 100
+    events_heartbeat_seconds : int = 15
+    # Enable change stream pre-images on tasks, ofx_files and transactions at
+    # startup (MongoDB 6.0+, needs collMod) so the stream also reports deletes
+    # and local publishes for those scopes can be dropped
+    events_pre_images : bool = False
+    # Lifetime of the tokens from POST /events/token; only needed to connect
+    events_token_expire_seconds : int = 60
+    # Without a change stream (no replica set) writes by other processes don't
+    # reach the ETag versions; keep ETags only if this is the only worker
+    etags_without_change_streams : bool = True
+
+    # Per-user task counters (/todos/stats) drift correction
+    task_counters_reconcile_interval_seconds : int = 3600
+    task_counters_reconcile_batch_size : int = 500
+
+    # Descriptions larger than this are zlib-compressed into task_descriptions
+    description_inline_max_bytes : int = 16384
+    description_compression_level : int = 6
+    # How much of a large description stays inline for /todos/search
+    description_search_excerpt_bytes : int = 8192
+
+    # Garbage collector (cascade deletes and orphan sweep)
+    gc_queue_size : int = 10000
+    gc_batch_size : int = 500
+    gc_batch_pause_ms : int = 100
+    gc_sweep_interval_seconds : int = 3600
+
+    # /todos/import
+    import_chunk_size : int = 1000
+    import_max_rows : int = 100000
+
+    # bcrypt runs on its own thread pool; sign-ins beyond max_pending get a 503
+    password_hash_workers : int = 4
+    password_hash_max_pending : int = 64
+    # bcrypt cost factor (each +1 doubles hash time); python calibrate_bcrypt.py
+    bcrypt_rounds : int = 12
+
+    # Cached role lookups behind require_admin
+    role_cache_max_entries : int = 10000
+    role_cache_ttl_seconds : int = 60
+
+    # Verified access tokens kept by get_user until they expire
+    token_cache_max_entries : int = 10000
+
+    # Access tokens are short-lived; refresh tokens rotate on every use and
+    # revocations (logout, reuse) reach other processes within the sync interval
+    access_token_expire_minutes : int = 60
+    refresh_token_expire_days : int = 14
+    token_denylist_sync_seconds : int = 5
+
+    # Sign-in throttling: failures per (username, client IP) and per client IP
+    # in a sliding window, then blocks with exponential backoff starting at
+    # base. Failures per username across IPs only delay attempts.
+    signin_window_seconds : int = 900
+    signin_max_failures_per_user_ip : int = 5
+    signin_max_failures_per_ip : int = 50
+    signin_max_failures_per_user : int = 20
+    signin_backoff_base_seconds : float = 1
+    signin_backoff_max_seconds : float = 900
+    signin_user_delay_max_seconds : float = 5
+    signin_limiter_max_entries : int = 100000
+
     model_config = SettingsConfigDict(env_file=".env")
 
 @lru_cache
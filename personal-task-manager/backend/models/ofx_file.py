@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Optional
 from beanie import Document, PydanticObjectId
 from pydantic import BaseModel, Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 
 class OFXFile(Document):
@@ -18,6 +19,13 @@ class OFXFile(Document):
 
     class Settings:
         name = "ofx_files"
+        indexes = [
+            # A user's uploads, newest first
+            IndexModel(
+                [("username", ASCENDING), ("upload_date", DESCENDING)],
+                name="username_upload_date",
+            ),
+        ]
 
 
 class Transaction(Document):
@@ -34,6 +42,32 @@ class Transaction(Document):
 
     class Settings:
         name = "transactions"
+        indexes = [
+            # Transactions of one OFX file (file detail and delete)
+            IndexModel(
+                [("ofx_file_id", ASCENDING), ("transaction_date", DESCENDING)],
+                name="ofx_file_id_transaction_date",
+            ),
+            # Transaction listing and monthly summaries by type and date range
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("transaction_type", ASCENDING),
+                    ("transaction_date", DESCENDING),
+                ],
+                name="username_type_date",
+            ),
+            # Transaction listing filtered by category
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("category", ASCENDING),
+                    ("transaction_type", ASCENDING),
+                    ("transaction_date", DESCENDING),
+                ],
+                name="username_category_type_date",
+            ),
+        ]
 
 
 class OFXFileRequest(BaseModel):
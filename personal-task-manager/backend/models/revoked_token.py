@@ -0,0 +1,26 @@
+# MODEL FOR REVOKED TOKENS (JTI DENY-LIST)
+
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+
+
+class RevokedToken(Document):
+    """A token id (jti) or session family that is no longer accepted"""
+
+    jti: str
+    username: str
+    revoked_at: datetime
+    expires_at: datetime  # when every token it covers has expired anyway
+
+    class Settings:
+        name = "revoked_tokens"
+        indexes = [
+            IndexModel([("jti", ASCENDING)], name="jti", unique=True),
+            # Incremental sync of the in-memory mirror
+            IndexModel([("revoked_at", ASCENDING)], name="revoked_at"),
+            # Mongo drops entries once they can no longer matter
+            IndexModel(
+                [("expires_at", ASCENDING)], name="expires_at", expireAfterSeconds=0
+            ),
+        ]
@@ -1,6 +1,17 @@
-from datetime import datetime
-from pydantic import BaseModel
-from beanie import Document
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+# How long a task stays in each level before it expires
+LEVEL_DURATIONS = {
+    "task": timedelta(days=1),
+    "todo": timedelta(days=7),
+    "gottado": timedelta(days=30),
+}
+# Where an expired task is promoted to (gottado is the last level)
+NEXT_LEVEL = {"task": "todo", "todo": "gottado"}
 
 
 class Task(Document):
@@ -18,9 +29,197 @@ class Task(Document):
     level: str = "task"
     username: str
     has_image: bool = False
+    # Large descriptions live compressed in task_descriptions (same _id) and
+    # description only holds an excerpt (for search) until loaded, see
+    # services/task_descriptions.py
+    description_external: bool = False
 
     class Settings:
         name = "tasks"
+        indexes = [
+            # Open tasks of one level, newest first (level listings)
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("completed", ASCENDING),
+                    ("level", ASCENDING),
+                    ("created_date", DESCENDING),
+                    ("_id", DESCENDING),
+                ],
+                name="username_completed_level_created_date",
+            ),
+            # All open tasks, newest first (keyset pages of /all)
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("completed", ASCENDING),
+                    ("created_date", DESCENDING),
+                    ("_id", DESCENDING),
+                ],
+                name="username_completed_created_date",
+            ),
+            # Board: open tasks, soonest expiry first
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("completed", ASCENDING),
+                    ("expired_date", ASCENDING),
+                    ("_id", ASCENDING),
+                ],
+                name="username_completed_expired_date",
+            ),
+            # Completed tasks, most recently completed first
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("completed", ASCENDING),
+                    ("completed_date", DESCENDING),
+                    ("_id", DESCENDING),
+                ],
+                name="username_completed_completed_date",
+            ),
+            # Expiry sweep: open tasks of a level whose expired_date has passed
+            IndexModel(
+                [
+                    ("completed", ASCENDING),
+                    ("level", ASCENDING),
+                    ("expired_date", ASCENDING),
+                ],
+                name="completed_level_expired_date",
+            ),
+            # Archiver: completed tasks older than the cutoff
+            IndexModel(
+                [("completed", ASCENDING), ("completed_date", ASCENDING)],
+                name="completed_completed_date",
+            ),
+            # Tag filters (tags is an array, so these are multikey indexes)
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("tags", ASCENDING),
+                    ("completed", ASCENDING),
+                    ("created_date", DESCENDING),
+                    ("_id", DESCENDING),
+                ],
+                name="username_tags_completed_created_date",
+            ),
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("tags", ASCENDING),
+                    ("completed", ASCENDING),
+                    ("completed_date", DESCENDING),
+                    ("_id", DESCENDING),
+                ],
+                name="username_tags_completed_completed_date",
+            ),
+            # Full-text search within one user's tasks (only one text index per collection)
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("title", TEXT),
+                    ("description", TEXT),
+                    ("tags", TEXT),
+                ],
+                weights={"title": 10, "tags": 5, "description": 1},
+                name="username_text",
+            ),
+        ]
+
+
+class ArchivedTask(Task):
+    """Completed task moved out of the tasks collection by the archiver"""
+
+    class Settings:
+        name = "tasks_archive"
+        indexes = [
+            # Completed history, most recently completed first
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("completed_date", DESCENDING),
+                    ("_id", DESCENDING),
+                ],
+                name="username_completed_date",
+            ),
+            # Tag filter of the completed history
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("tags", ASCENDING),
+                    ("completed_date", DESCENDING),
+                    ("_id", DESCENDING),
+                ],
+                name="username_tags_completed_date",
+            ),
+            # Full-text search, same fields and weights as tasks
+            IndexModel(
+                [
+                    ("username", ASCENDING),
+                    ("title", TEXT),
+                    ("description", TEXT),
+                    ("tags", TEXT),
+                ],
+                weights={"title": 10, "tags": 5, "description": 1},
+                name="username_text",
+            ),
+        ]
+
+
+class TaskDescription(Document):
+    """Large task description stored outside its task, zlib-compressed"""
+
+    username: str
+    data: bytes
+    size: int  # uncompressed size in bytes
+
+    class Settings:
+        name = "task_descriptions"
+        indexes = [
+            # A user's descriptions (account cleanup)
+            IndexModel([("username", ASCENDING)], name="username"),
+        ]
+
+
+class TaskWithoutDescription(BaseModel):
+    """Projection model for Task without the description field (task lists)"""
+
+    id: PydanticObjectId = Field(alias="_id")
+    title: str = "New Task"
+    tags: list[str] = []
+    completed: bool = False
+    created_date: datetime
+    expired_date: datetime
+    completed_date: datetime = datetime(year=44, month=3, day=15)
+    high_priority: bool = False
+    level: str = "task"
+    username: str
+    has_image: bool = False
+    description_external: bool = False
+
+    model_config = {
+        "populate_by_name": True,
+        "arbitrary_types_allowed": True,
+        "json_encoders": {PydanticObjectId: str},
+    }
+
+
+class TaskOwnerOnly(BaseModel):
+    """Projection model for Task with only the id and owner"""
+
+    id: PydanticObjectId = Field(alias="_id")
+    username: str
+
+    model_config = {"populate_by_name": True}
+
+
+class TaskCountedOnly(BaseModel):
+    """Projection model for Task with the fields the per-user counters depend on"""
+
+    completed: bool = False
+    completed_date: datetime = datetime(year=44, month=3, day=15)
+    high_priority: bool = False
+    level: str = "task"
 
 
 # This is for the creating a task
@@ -37,3 +236,20 @@ class TaskRequest(BaseModel):
     high_priority: bool = False
     level: str = "task"
     has_image: bool = False
+
+
+# One entry of a bulk update: the task to change and the new field values.
+# Fields left as None are not touched.
+class TaskBulkOperation(BaseModel):
+    id: PydanticObjectId
+    title: Optional[str] = Field(None, min_length=3, max_length=50)
+    description: Optional[str] = Field(None, max_length=1000000)
+    expired_date: Optional[datetime] = None
+    level: Optional[Literal["task", "todo", "gottado"]] = None
+    completed: Optional[bool] = None
+    high_priority: Optional[bool] = None
+    delete: bool = False
+
+
+class TaskBulkRequest(BaseModel):
+    operations: list[TaskBulkOperation] = Field(..., min_length=1, max_length=1000)
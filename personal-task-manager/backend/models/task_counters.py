@@ -0,0 +1,25 @@
+# MODEL FOR PER-USER TASK COUNTERS
+
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class TaskCounters(Document):
+    """Badge counts for one user, kept current by the task write endpoints"""
+
+    username: str
+    # Open (uncompleted) tasks per level
+    task: int = 0
+    todo: int = 0
+    gottado: int = 0
+    high_priority: int = 0  # open high-priority tasks
+    completed_weeks: Dict[str, int] = {}  # ISO week ("2026-W42") -> tasks completed
+    reconciled_at: Optional[datetime] = None
+
+    class Settings:
+        name = "task_counters"
+        indexes = [
+            IndexModel([("username", ASCENDING)], name="username", unique=True),
+        ]
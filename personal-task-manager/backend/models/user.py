@@ -1,5 +1,6 @@
 from beanie import Document
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
 
 class User(Document):
     username: str
@@ -9,6 +10,9 @@ class User(Document):
 
     class Settings:
         name = "users"
+        indexes = [
+            IndexModel([("username", ASCENDING)], name="username", unique=True),
+        ]
 
 
 
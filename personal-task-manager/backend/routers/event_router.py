@@ -0,0 +1,89 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+import json
+import logging
+
+from models.log import Log
+from models.my_config import get_settings
+from services.audit_writer import audit_writer
+from services.event_bus import event_bus
+from auth.jwt_auth import TokenData, create_events_token, get_events_user
+from routers.user_router import get_user
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+event_router = APIRouter()
+
+
+# POST
+# Short-lived token for opening the event stream from a browser, where
+# EventSource can't send the Authorization header:
+#   new EventSource(`/events?token=${token}`)
+# It is only accepted by GET /events and is checked when the stream opens, so
+# a stream outlives it; fetch a new one before reconnecting after an error.
+@event_router.post("/token", status_code=status.HTTP_200_OK)
+async def create_stream_token(
+    current_user: Annotated[TokenData, Depends(get_user)],
+) -> dict:
+    return {
+        "token": create_events_token(current_user),
+        "expires_in": get_settings().events_token_expire_seconds,
+    }
+
+
+# GET
+# Server-Sent Events stream of the user's data changes, authenticated by an
+# events token in ?token= or a bearer access token
+# Each event is named after the scope that changed ("tasks", "files" or
+# "budget") so the client only refetches that view. A comment line is sent
+# every events_heartbeat_seconds to keep proxies from closing the connection.
+@event_router.get("", status_code=status.HTTP_200_OK)
+async def stream_events(
+    request: Request, current_user: Annotated[TokenData, Depends(get_events_user)]
+) -> StreamingResponse:
+    logger.info(f"User {current_user.username} opening event stream")
+    subscription = event_bus.subscribe(current_user.username)
+    if subscription is None:
+        logger.warning(f"User {current_user.username} has too many event streams")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open event streams",
+        )
+
+    now = datetime.now()
+    newLog = Log(
+        username=current_user.username,
+        endpoint="stream_events",
+        time=now,
+        details={"mode": event_bus.mode},
+    )
+    await audit_writer.write(newLog)
+
+    heartbeat = get_settings().events_heartbeat_seconds
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not subscription.closed:
+                scopes = await subscription.wait(heartbeat)
+                if await request.is_disconnected():
+                    break
+                if not scopes:
+                    yield ": keepalive\n\n"
+                    continue
+                time = datetime.now().isoformat()
+                for scope in sorted(scopes):
+                    data = json.dumps({"scope": scope, "time": time})
+                    yield f"event: {scope}\ndata: {data}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+            logger.info(f"User {current_user.username} closed event stream")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
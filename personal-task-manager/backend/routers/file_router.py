@@ -16,6 +16,9 @@ from fastapi import (
 from fastapi.encoders import isoformat
 from models.file import File, FileRequest, FileWithoutData
 from models.log import Log
+from services.audit_writer import audit_writer
+from services.data_versions import data_versions, etag_check
+from services.task_cache import task_cache
 from models.task import Task
 from auth.jwt_auth import TokenData
 from routers.user_router import get_user
@@ -31,7 +34,11 @@ file_router = APIRouter()
 
 # GET Operations
 # Get all files
-@file_router.get("/all", status_code=status.HTTP_200_OK)
+@file_router.get(
+    "/all",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("files"))],
+)
 async def get_all(
     current_user: Annotated[TokenData, Depends(get_user)],
     skip: int = 0,
@@ -48,7 +55,7 @@ async def get_all(
         time=now,
         details={"action": "get_all_files", "include_data": include_data},
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     # Use find_many instead which has cleaner handling of projections
     if include_data:
@@ -86,7 +93,11 @@ async def get_all(
 
 
 # Get files for a specific task
-@file_router.get("/task/{task_id}", status_code=status.HTTP_200_OK)
+@file_router.get(
+    "/task/{task_id}",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("files"))],
+)
 async def get_files_by_task(
     task_id: Annotated[str, Path()],
     current_user: Annotated[TokenData, Depends(get_user)],
@@ -117,7 +128,7 @@ async def get_files_by_task(
         time=now,
         details={"task_id": task_id, "include_data": include_data},
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     # Use different approaches based on whether we need the data
     if include_data:
@@ -200,6 +211,10 @@ async def upload_file(
 
     # Save the file to the database
     await file_doc.insert()
+    data_versions.bump(current_user.username, "files")
+    if file_doc.task_id:
+        # Attachments change what the task views show
+        task_cache.invalidate(current_user.username)
     logger.info(f"File uploaded successfully: ID={file_doc.id}, size={file_size} bytes")
 
     # Log the action
@@ -214,7 +229,7 @@ async def upload_file(
             "task_id": task_id if task_id else None,
         },
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     # Return the file ID and metadata (without the binary data)
     return {
@@ -260,6 +275,9 @@ async def delete_file(
 
         # Delete the file
         await file.delete()
+        data_versions.bump(current_user.username, "files")
+        if file.task_id:
+            task_cache.invalidate(current_user.username)
         logger.info(f"File deleted successfully: {file_id}, filename: {file.filename}")
 
         # Log the action
@@ -270,7 +288,7 @@ async def delete_file(
             time=now,
             details={"file_id": file_id, "filename": file.filename},
         )
-        await Log.insert_one(newLog)
+        await audit_writer.write(newLog)
 
         return {"message": "File deleted successfully", "id": file_id}
 
@@ -1,12 +1,26 @@
 from typing import Annotated, Optional
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
 from datetime import datetime, timedelta
 import logging
 
 from models.log import Log
+from db.ndjson import ndjson_response, wants_ndjson
+from services.audit_writer import audit_writer
+from services.event_bus import event_bus
+from services.expiry_scheduler import expiry_scheduler
+from services.garbage_collector import garbage_collector
+from services.password_hasher import password_hasher
+from services.role_cache import role_cache
+from services.signin_limiter import signin_limiter
+from services.task_archiver import task_archiver
+from services.task_cache import task_cache
+from services.task_counters import task_counters
+from services.task_descriptions import task_descriptions
+from services.token_cache import token_cache
+from services.token_denylist import token_denylist
 from models.user import User
-from auth.jwt_auth import TokenData
+from auth.jwt_auth import TokenData, require_admin
 from routers.user_router import get_user
 
 # Set up logger
@@ -18,24 +32,14 @@ log_router = APIRouter()
 # Get all logs (admin only)
 @log_router.get("/all", status_code=status.HTTP_200_OK)
 async def get_all_logs(
-    current_user: Annotated[TokenData, Depends(get_user)],
+    request: Request,
+    current_user: Annotated[TokenData, Depends(require_admin)],
     skip: int = 0,
     limit: int = 50,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
 ):
     logger.info(f"User {current_user.username} attempting to get all logs")
-    # Verify the user is an admin
-    user = await User.find_one(User.username == current_user.username)
-    if not user or user.role != "admin":
-        logger.warning(
-            f"Non-admin user {current_user.username} attempted to access all logs"
-        )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin privileges required",
-        )
-
     # Build query filters
     query_filter = {}
     if start_date and end_date:
@@ -45,10 +49,19 @@ async def get_all_logs(
     elif end_date:
         query_filter["time"] = {"$lte": end_date}
 
-    # Get logs with pagination
-    logs = (
-        await Log.find(query_filter).sort(-Log.time).skip(skip).limit(limit).to_list()
-    )
+    # Streaming export: every matching log, skip and limit are ignored
+    stream = wants_ndjson(request)
+    if stream:
+        response = ndjson_response(Log.find(query_filter).sort(-Log.time))
+    else:
+        # Get logs with pagination
+        logs = (
+            await Log.find(query_filter)
+            .sort(-Log.time)
+            .skip(skip)
+            .limit(limit)
+            .to_list()
+        )
 
     # Log this admin action
     now = datetime.now()
@@ -57,14 +70,18 @@ async def get_all_logs(
         endpoint="get_all_logs",
         time=now,
         details={
-            "action": "admin_view_all_logs",
+            "action": "admin_export_all_logs" if stream else "admin_view_all_logs",
             "filters": {
                 "start_date": start_date.isoformat() if start_date else None,
                 "end_date": end_date.isoformat() if end_date else None,
             },
         },
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
+
+    if stream:
+        logger.info(f"Admin {current_user.username} is exporting logs")
+        return response
 
     logger.info(f"Admin {current_user.username} retrieved {len(logs)} logs")
     return logs
@@ -74,7 +91,7 @@ async def get_all_logs(
 @log_router.get("/user/{username}", status_code=status.HTTP_200_OK)
 async def get_user_logs(
     username: Annotated[str, Path()],
-    current_user: Annotated[TokenData, Depends(get_user)],
+    current_user: Annotated[TokenData, Depends(require_admin)],
     skip: int = 0,
     limit: int = 50,
     start_date: Optional[datetime] = None,
@@ -83,17 +100,6 @@ async def get_user_logs(
     logger.info(
         f"User {current_user.username} attempting to get logs for user {username}"
     )
-    # Verify the user is an admin
-    user = await User.find_one(User.username == current_user.username)
-    if not user or user.role != "admin":
-        logger.warning(
-            f"Non-admin user {current_user.username} attempted to access logs for user {username}"
-        )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin privileges required",
-        )
-
     # Verify the target user exists
     target_user = await User.find_one(User.username == username)
     if not target_user:
@@ -134,7 +140,7 @@ async def get_user_logs(
             },
         },
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     logger.info(
         f"Admin {current_user.username} retrieved {len(logs)} logs for user {username}"
@@ -180,7 +186,28 @@ async def get_my_logs(
             },
         },
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     logger.info(f"User {current_user.username} retrieved {len(logs)} of their own logs")
     return logs
+
+
+# Background service metrics (admin only)
+@log_router.get("/stats", status_code=status.HTTP_200_OK)
+async def get_service_stats(current_user: Annotated[TokenData, Depends(require_admin)]):
+    logger.info(f"User {current_user.username} retrieving background service stats")
+    return {
+        "audit_writer": audit_writer.stats(),
+        "event_bus": event_bus.stats(),
+        "expiry_scheduler": expiry_scheduler.stats(),
+        "garbage_collector": garbage_collector.stats(),
+        "password_hasher": password_hasher.stats(),
+        "role_cache": role_cache.stats(),
+        "signin_limiter": signin_limiter.stats(),
+        "task_archiver": task_archiver.stats(),
+        "task_cache": task_cache.stats(),
+        "task_counters": task_counters.stats(),
+        "task_descriptions": task_descriptions.stats(),
+        "token_cache": token_cache.stats(),
+        "token_denylist": token_denylist.stats(),
+    }
@@ -10,6 +10,7 @@ from fastapi import (
     UploadFile,
     File as FastAPIFile,
     Form,
+    Request,
 )
 from fastapi.responses import JSONResponse
 from models.ofx_file import (
@@ -21,6 +22,9 @@ from models.ofx_file import (
     MonthlySummary,
 )
 from models.log import Log
+from db.ndjson import ndjson_response, wants_ndjson
+from services.data_versions import data_versions, etag_check
+from services.audit_writer import audit_writer
 from auth.jwt_auth import TokenData
 from routers.user_router import get_user
 from ofxparse import OfxParser
@@ -77,6 +81,7 @@ async def upload_ofx_file(
 
         # Save OFX file record
         await ofx_file.insert()
+        data_versions.bump(current_user.username, "budget")
 
         # Parse OFX content
         try:
@@ -112,6 +117,7 @@ async def upload_ofx_file(
             ofx_file.parsed_status = "success"
             ofx_file.transaction_count = transaction_count
             await ofx_file.save()
+            data_versions.bump(current_user.username, "budget")
 
             logger.info(
                 f"Successfully parsed {transaction_count} transactions from {file.filename}"
@@ -122,6 +128,7 @@ async def upload_ofx_file(
             ofx_file.parsed_status = "error"
             ofx_file.parse_error = str(parse_error)
             await ofx_file.save()
+            data_versions.bump(current_user.username, "budget")
 
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -141,7 +148,7 @@ async def upload_ofx_file(
                 "status": ofx_file.parsed_status,
             },
         )
-        await Log.insert_one(log_entry)
+        await audit_writer.write(log_entry)
 
         return {
             "message": "OFX file uploaded and parsed successfully",
@@ -158,7 +165,11 @@ async def upload_ofx_file(
         )
 
 
-@ofx_router.get("/files", status_code=status.HTTP_200_OK)
+@ofx_router.get(
+    "/files",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("budget"))],
+)
 async def get_ofx_files(
     current_user: Annotated[TokenData, Depends(get_user)],
     skip: int = 0,
@@ -183,12 +194,16 @@ async def get_ofx_files(
         time=now,
         details={"count": len(files)},
     )
-    await Log.insert_one(log_entry)
+    await audit_writer.write(log_entry)
 
     return files
 
 
-@ofx_router.get("/files/{file_id}", status_code=status.HTTP_200_OK)
+@ofx_router.get(
+    "/files/{file_id}",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("budget"))],
+)
 async def get_ofx_file(
     file_id: Annotated[str, Path()],
     current_user: Annotated[TokenData, Depends(get_user)],
@@ -249,6 +264,7 @@ async def delete_ofx_file(
 
         # Delete the OFX file
         await ofx_file.delete()
+        data_versions.bump(current_user.username, "budget")
 
         # Log the action
         now = datetime.now()
@@ -258,7 +274,7 @@ async def delete_ofx_file(
             time=now,
             details={"file_id": file_id, "filename": ofx_file.original_filename},
         )
-        await Log.insert_one(log_entry)
+        await audit_writer.write(log_entry)
 
         return {"message": "OFX file and transactions deleted successfully"}
 
@@ -268,8 +284,13 @@ async def delete_ofx_file(
         )
 
 
-@ofx_router.get("/transactions", status_code=status.HTTP_200_OK)
+@ofx_router.get(
+    "/transactions",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("budget"))],
+)
 async def get_transactions(
+    request: Request,
     current_user: Annotated[TokenData, Depends(get_user)],
     skip: int = 0,
     limit: int = 50,
@@ -278,7 +299,11 @@ async def get_transactions(
     end_date: Optional[datetime] = None,
     transaction_type: Optional[str] = "debit",  # Default to debit (spending)
 ):
-    """Get transactions for the current user with optional filtering"""
+    """Get transactions for the current user with optional filtering.
+
+    With "Accept: application/x-ndjson" every matching transaction is streamed
+    instead (skip and limit are ignored).
+    """
     logger.info(f"User {current_user.username} retrieving transactions")
 
     # Build query
@@ -298,6 +323,11 @@ async def get_transactions(
             date_query["$lte"] = end_date
         query["transaction_date"] = date_query
 
+    if wants_ndjson(request):
+        return ndjson_response(
+            Transaction.find(query).sort(-Transaction.transaction_date)
+        )
+
     transactions = (
         await Transaction.find(query)
         .sort(-Transaction.transaction_date)
@@ -336,6 +366,7 @@ async def update_transaction_category(
         # Update category
         transaction.category = category_update.category
         await transaction.save()
+        data_versions.bump(current_user.username, "budget")
 
         # Log the action
         now = datetime.now()
@@ -349,7 +380,7 @@ async def update_transaction_category(
                 "new_category": category_update.category,
             },
         )
-        await Log.insert_one(log_entry)
+        await audit_writer.write(log_entry)
 
         return {"message": "Transaction category updated successfully"}
 
@@ -366,7 +397,11 @@ async def get_categories():
     return {"categories": SPENDING_CATEGORIES}
 
 
-@ofx_router.get("/summary", status_code=status.HTTP_200_OK)
+@ofx_router.get(
+    "/summary",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("budget"))],
+)
 async def get_spending_summary(
     current_user: Annotated[TokenData, Depends(get_user)],
     month: Optional[str] = None,
@@ -450,7 +485,7 @@ async def get_spending_summary(
             "category_count": len(categories),
         },
     )
-    await Log.insert_one(log_entry)
+    await audit_writer.write(log_entry)
 
     return {
         "month": month or f"{now.year}-{now.month:02d}",
@@ -459,7 +494,11 @@ async def get_spending_summary(
     }
 
 
-@ofx_router.get("/summary/multi-month", status_code=status.HTTP_200_OK)
+@ofx_router.get(
+    "/summary/multi-month",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("budget"))],
+)
 async def get_multi_month_summary(
     current_user: Annotated[TokenData, Depends(get_user)],
     start_month: str,  # YYYY-MM format
@@ -542,7 +581,7 @@ async def get_multi_month_summary(
                 "month_count": len(monthly_totals),
             },
         )
-        await Log.insert_one(log_entry)
+        await audit_writer.write(log_entry)
 
         return {
             "start_month": start_month,
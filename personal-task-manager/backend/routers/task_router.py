@@ -1,14 +1,61 @@
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime
+from functools import lru_cache
 from time import strftime
-from typing import Annotated, Literal
+from typing import Annotated, Literal, Optional
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
-from fastapi.encoders import isoformat
-from models.task import Task, TaskRequest
+from bson.errors import InvalidId
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import isoformat, jsonable_encoder
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, create_model
+from beanie.operators import In
+from pymongo import DESCENDING, DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from models.task import (
+    LEVEL_DURATIONS,
+    ArchivedTask,
+    Task,
+    TaskBulkRequest,
+    TaskCountedOnly,
+    TaskOwnerOnly,
+    TaskRequest,
+    TaskWithoutDescription,
+)
 from models.log import Log
+from db.ndjson import ndjson_response, wants_ndjson
+from db.task_io import (
+    EXPORT_MEDIA_TYPES,
+    csv_header,
+    csv_lines,
+    import_format,
+    read_rows,
+    task_record,
+)
+from models.my_config import get_settings
+from services.audit_writer import audit_writer
+from services.data_versions import etag_check
+from services.garbage_collector import garbage_collector
+from services.task_archiver import task_archiver
+from services.task_cache import task_cache
+from services.task_counters import task_counters, week_key
+from services.task_descriptions import task_descriptions
 from auth.jwt_auth import TokenData
 from routers.user_router import get_user
 from datetime import datetime
+import base64
+import csv
+import json
 import logging
 
 # Set up logger
@@ -19,10 +66,164 @@ task_router = APIRouter()
 # levels = ["task", "todo", "gottado"]
 
 
+# Keyset pagination
+# A cursor is the (sort date, _id) of the last task on the previous page,
+# base64-encoded so clients treat it as opaque. The next page starts strictly
+# after it, so a deep page costs the same as the first one.
+def _encode_cursor(sort_value: datetime, id: PydanticObjectId) -> str:
+    raw = json.dumps({"d": sort_value.isoformat(), "i": str(id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, PydanticObjectId]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(raw["d"]), PydanticObjectId(raw["i"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+# Sparse fieldsets
+# Task lists leave out the description (up to a million characters) and return
+# TaskWithoutDescription instead. ?fields=title,level,... picks the returned
+# fields explicitly; _id is always included. GET /todos/{id} has the full task.
+TASK_FIELDS = [name for name in Task.model_fields if name not in ("id", "revision_id")]
+
+
+def _task_fields(
+    fields: Annotated[
+        Optional[str],
+        Query(description="Comma-separated task fields to return, e.g. title,level"),
+    ] = None,
+) -> Optional[frozenset[str]]:
+    if fields is None:
+        return None
+    requested = frozenset(field.strip() for field in fields.split(",") if field.strip())
+    unknown = requested - set(TASK_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown task fields: {', '.join(sorted(unknown))}. "
+            f"Choose from: {', '.join(TASK_FIELDS)}",
+        )
+    return requested
+
+
+TaskFields = Annotated[Optional[frozenset[str]], Depends(_task_fields)]
+
+
+@lru_cache
+def _projection_model(fields: Optional[frozenset[str]]) -> type[BaseModel]:
+    if fields is None:
+        return TaskWithoutDescription
+    if "description" in fields:
+        # Tells task_descriptions.hydrate which descriptions to load
+        fields = fields | {"description_external"}
+    return create_model(
+        "TaskFields",
+        __config__=ConfigDict(populate_by_name=True),
+        id=(PydanticObjectId, Field(alias="_id")),
+        **{
+            name: (Optional[Task.model_fields[name].annotation], None)
+            for name in sorted(fields)
+        },
+    )
+
+
+def _projection(model: type[BaseModel]) -> dict:
+    return {field.alias or name: 1 for name, field in model.model_fields.items()}
+
+
+# Newest first on (sort_field, _id), limit + 1 rows to know if there's a next page.
+# Pages without descriptions are served from the per-user task cache under `view`.
+# With stream=True every remaining task after the cursor is sent as NDJSON instead.
+# With archived=True tasks_archive is read as well and both pages are merged.
+async def _task_page(
+    view: str,
+    query: dict,
+    sort_field: str,
+    limit: int,
+    cursor: Optional[str],
+    tag: Optional[str] = None,
+    stream: bool = False,
+    archived: bool = False,
+    fields: Optional[frozenset[str]] = None,
+) -> dict | StreamingResponse:
+    if tag:
+        query = {**query, "tags": tag}
+    if cursor:
+        sort_value, last_id = _decode_cursor(cursor)
+        query = {
+            **query,
+            "$or": [
+                {sort_field: {"$lt": sort_value}},
+                {sort_field: sort_value, "_id": {"$lt": last_id}},
+            ],
+        }
+
+    sort = [(sort_field, DESCENDING), ("_id", DESCENDING)]
+    # The sort field is needed to build the next cursor
+    projection = _projection_model(fields | {sort_field} if fields else None)
+    sources = [Task, ArchivedTask] if archived else [Task]
+    queries = [source.find(query).sort(sort).project(projection) for source in sources]
+    hydrate = bool(fields and "description" in fields)
+    if stream:
+        # Hot tasks first, then the archive (which only holds older ones)
+        return ndjson_response(
+            *queries, prepare=task_descriptions.hydrate if hydrate else None
+        )
+
+    async def load_page() -> dict:
+        items = []
+        for tasks in queries:
+            items += await tasks.limit(limit + 1).to_list()
+        if archived:
+            items.sort(key=lambda t: (getattr(t, sort_field), t.id), reverse=True)
+            items = items[: limit + 1]
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = _encode_cursor(getattr(last, sort_field), last.id)
+        if hydrate:
+            await task_descriptions.hydrate(items)
+        return {"items": items, "next_cursor": next_cursor}
+
+    # Descriptions can be up to a megabyte each, so pages with them aren't
+    # cached. Neither are pages after the first: cursors make every deeper page
+    # its own key, and one user scrolling would push out everyone else's entries
+    if hydrate or cursor:
+        return await load_page()
+
+    fields_key = ",".join(sorted(fields)) if fields else ""
+    return await task_cache.get_or_load(
+        query["username"],
+        f"{view}:{tag or ''}:{fields_key}:{limit}",
+        load_page,
+    )
+
+
+PageLimit = Annotated[int, Query(ge=1, le=500)]
+
+
 # GET Operations
 # Get all task types
-@task_router.get("/all", status_code=status.HTTP_200_OK)
-async def get_all(current_user: Annotated[TokenData, Depends(get_user)]) -> list:
+@task_router.get(
+    "/all",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def get_all(
+    request: Request,
+    current_user: Annotated[TokenData, Depends(get_user)],
+    fields: TaskFields,
+    limit: PageLimit = 100,
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+) -> dict:
     logger.info(f"User {current_user.username} retrieving all tasks")
     now = datetime.now()
     newLog = Log(
@@ -31,15 +232,33 @@ async def get_all(current_user: Annotated[TokenData, Depends(get_user)]) -> list
         time=now,
         details={"action": "get_all_tasks"},
     )
-    await Log.insert_one(newLog)
-    return await Task.find(
-        Task.username == current_user.username, Task.completed == False
-    ).to_list()
+    await audit_writer.write(newLog)
+    return await _task_page(
+        "all",
+        {"username": current_user.username, "completed": False},
+        "created_date",
+        limit,
+        cursor,
+        tag=tag,
+        stream=wants_ndjson(request),
+        fields=fields,
+    )
 
 
 # Get tasks
-@task_router.get("/tasks", status_code=status.HTTP_200_OK)
-async def get_tasks(current_user: Annotated[TokenData, Depends(get_user)]) -> list:
+@task_router.get(
+    "/tasks",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def get_tasks(
+    request: Request,
+    current_user: Annotated[TokenData, Depends(get_user)],
+    fields: TaskFields,
+    limit: PageLimit = 100,
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+) -> dict:
     logger.info(f"User {current_user.username} retrieving tasks (level: task)")
     now = datetime.now()
     newLog = Log(
@@ -48,17 +267,33 @@ async def get_tasks(current_user: Annotated[TokenData, Depends(get_user)]) -> li
         time=now,
         details={"level": "task"},
     )
-    await Log.insert_one(newLog)
-    return await Task.find(
-        Task.level == "task",
-        Task.username == current_user.username,
-        Task.completed == False,
-    ).to_list()
+    await audit_writer.write(newLog)
+    return await _task_page(
+        "task",
+        {"level": "task", "username": current_user.username, "completed": False},
+        "created_date",
+        limit,
+        cursor,
+        tag=tag,
+        stream=wants_ndjson(request),
+        fields=fields,
+    )
 
 
 # Get todos
-@task_router.get("/todos", status_code=status.HTTP_200_OK)
-async def get_todos(current_user: Annotated[TokenData, Depends(get_user)]) -> list:
+@task_router.get(
+    "/todos",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def get_todos(
+    request: Request,
+    current_user: Annotated[TokenData, Depends(get_user)],
+    fields: TaskFields,
+    limit: PageLimit = 100,
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+) -> dict:
     logger.info(f"User {current_user.username} retrieving todos (level: todo)")
     now = datetime.now()
     newLog = Log(
@@ -67,17 +302,33 @@ async def get_todos(current_user: Annotated[TokenData, Depends(get_user)]) -> li
         time=now,
         details={"level": "todo"},
     )
-    await Log.insert_one(newLog)
-    return await Task.find(
-        Task.level == "todo",
-        Task.username == current_user.username,
-        Task.completed == False,
-    ).to_list()
+    await audit_writer.write(newLog)
+    return await _task_page(
+        "todo",
+        {"level": "todo", "username": current_user.username, "completed": False},
+        "created_date",
+        limit,
+        cursor,
+        tag=tag,
+        stream=wants_ndjson(request),
+        fields=fields,
+    )
 
 
 # Get gottados
-@task_router.get("/gottados", status_code=status.HTTP_200_OK)
-async def get_gottados(current_user: Annotated[TokenData, Depends(get_user)]) -> list:
+@task_router.get(
+    "/gottados",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def get_gottados(
+    request: Request,
+    current_user: Annotated[TokenData, Depends(get_user)],
+    fields: TaskFields,
+    limit: PageLimit = 100,
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+) -> dict:
     logger.info(f"User {current_user.username} retrieving gottados (level: gottado)")
     now = datetime.now()
     newLog = Log(
@@ -86,17 +337,187 @@ async def get_gottados(current_user: Annotated[TokenData, Depends(get_user)]) ->
         time=now,
         details={"level": "gottado"},
     )
-    await Log.insert_one(newLog)
-    return await Task.find(
-        Task.level == "gottado",
-        Task.username == current_user.username,
-        Task.completed == False,
-    ).to_list()
+    await audit_writer.write(newLog)
+    return await _task_page(
+        "gottado",
+        {"level": "gottado", "username": current_user.username, "completed": False},
+        "created_date",
+        limit,
+        cursor,
+        tag=tag,
+        stream=wants_ndjson(request),
+        fields=fields,
+    )
+
+
+# Get the whole board (tasks, todos and gottados) in one query.
+# Each level returns at most `limit` tasks (soonest expiry first) and its full
+# count; the per-level endpoints page through the rest. Descriptions are never
+# part of the board.
+@task_router.get(
+    "/board",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def get_board(
+    current_user: Annotated[TokenData, Depends(get_user)],
+    fields: TaskFields,
+    limit: PageLimit = 100,
+) -> dict:
+    logger.info(f"User {current_user.username} retrieving board")
+    now = datetime.now()
+    newLog = Log(
+        username=current_user.username,
+        endpoint="get_board",
+        time=now,
+        details={"action": "get_board"},
+    )
+    await audit_writer.write(newLog)
+
+    if fields and "description" in fields:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The board doesn't include descriptions, use GET /todos/{id}",
+        )
+    # Tasks are grouped by level, so it is always returned
+    model = _projection_model(fields | {"level"} if fields else None)
+
+    async def load_board() -> dict:
+        # One aggregation: each level's soonest-expiring tasks, capped with
+        # $limit inside $facet, plus the count per level
+        levels = ("task", "todo", "gottado")
+        result = (
+            await Task.find(
+                Task.username == current_user.username, Task.completed == False
+            )
+            .aggregate(
+                [
+                    {"$sort": {"expired_date": 1, "_id": 1}},
+                    {"$project": _projection(model)},
+                    {
+                        "$facet": {
+                            **{
+                                level: [{"$match": {"level": level}}, {"$limit": limit}]
+                                for level in levels
+                            },
+                            "counts": [
+                                {"$group": {"_id": "$level", "count": {"$sum": 1}}}
+                            ],
+                        }
+                    },
+                ]
+            )
+            .to_list()
+        )[0]
+
+        board = {
+            f"{level}s": [model.model_validate(item) for item in result[level]]
+            for level in levels
+        }
+        counts = {level: 0 for level in levels}
+        for group in result["counts"]:
+            if group["_id"] in counts:
+                counts[group["_id"]] = group["count"]
+
+        return {**board, "counts": counts}
+
+    fields_key = ",".join(sorted(fields)) if fields else ""
+    return await task_cache.get_or_load(
+        current_user.username, f"board:{fields_key}:{limit}", load_board
+    )
+
+
+# Get the user's tags with how many tasks use each
+@task_router.get(
+    "/tags",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def get_tags(
+    current_user: Annotated[TokenData, Depends(get_user)],
+    completed: Optional[bool] = None,
+) -> dict:
+    logger.info(f"User {current_user.username} retrieving tags")
+    now = datetime.now()
+    newLog = Log(
+        username=current_user.username,
+        endpoint="get_tags",
+        time=now,
+        details={"completed": completed},
+    )
+    await audit_writer.write(newLog)
+
+    match = {"username": current_user.username}
+    if completed is not None:
+        match["completed"] = completed
+
+    # Completed tasks may have been moved to tasks_archive
+    pipeline = [{"$match": match}]
+    if completed is not False:
+        archived = ArchivedTask.get_collection_name()
+        pipeline.append(
+            {"$unionWith": {"coll": archived, "pipeline": [{"$match": match}]}}
+        )
+
+    async def load_tags() -> dict:
+        groups = await Task.aggregate(
+            [
+                *pipeline,
+                {"$unwind": "$tags"},
+                {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ]
+        ).to_list()
+        return {"tags": [{"tag": g["_id"], "count": g["count"]} for g in groups]}
+
+    return await task_cache.get_or_load(
+        current_user.username, f"tags:{completed}", load_tags
+    )
+
+
+# Get badge counts from the user's counters document
+@task_router.get("/stats", status_code=status.HTTP_200_OK)
+async def get_task_stats(
+    current_user: Annotated[TokenData, Depends(get_user)],
+) -> dict:
+    logger.info(f"User {current_user.username} retrieving task stats")
+    now = datetime.now()
+    newLog = Log(
+        username=current_user.username,
+        endpoint="get_task_stats",
+        time=now,
+        details={"action": "get_task_stats"},
+    )
+    await audit_writer.write(newLog)
+
+    counters = await task_counters.get(current_user.username)
+    open_tasks = {
+        "task": counters.task,
+        "todo": counters.todo,
+        "gottado": counters.gottado,
+    }
+    return {
+        "open": open_tasks,
+        "total_open": sum(open_tasks.values()),
+        "high_priority": counters.high_priority,
+        "completed_this_week": counters.completed_weeks.get(week_key(now), 0),
+    }
 
 
 # Get completed
-@task_router.get("/completed", status_code=status.HTTP_200_OK)
-async def get_completed(current_user: Annotated[TokenData, Depends(get_user)]) -> dict:
+@task_router.get(
+    "/completed",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def get_completed(
+    request: Request,
+    current_user: Annotated[TokenData, Depends(get_user)],
+    fields: TaskFields,
+    limit: PageLimit = 100,
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+) -> dict:
     logger.info(f"User {current_user.username} retrieving completed tasks")
     now = datetime.now()
     newLog = Log(
@@ -105,14 +526,23 @@ async def get_completed(current_user: Annotated[TokenData, Depends(get_user)]) -
         time=now,
         details={"completed": True},
     )
-    await Log.insert_one(newLog)
-
-    completed_items = await Task.find(
-        Task.completed == True, Task.username == current_user.username
-    ).to_list()
+    await audit_writer.write(newLog)
+
+    # Most recently completed first, including tasks moved to the archive
+    page = await _task_page(
+        "completed",
+        {"completed": True, "username": current_user.username},
+        "completed_date",
+        limit,
+        cursor,
+        tag=tag,
+        stream=wants_ndjson(request),
+        archived=True,
+        fields=fields,
+    )
 
-    if completed_items:
-        return {"items": completed_items}
+    if isinstance(page, StreamingResponse) or page["items"] or cursor:
+        return page
     else:
         logger.warning(f"User {current_user.username} has no completed tasks")
         raise HTTPException(
@@ -120,6 +550,169 @@ async def get_completed(current_user: Annotated[TokenData, Depends(get_user)]) -
         )
 
 
+# Search tasks by title, description and tags, most relevant first.
+# Unless completed=false, archived tasks are searched too ($unionWith) and
+# ranked together with the rest. Of descriptions stored out of line only the
+# inline excerpt (the first description_search_excerpt_bytes) is searched.
+@task_router.get(
+    "/search",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def search_tasks(
+    current_user: Annotated[TokenData, Depends(get_user)],
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    fields: TaskFields,
+    level: Optional[Literal["task", "todo", "gottado"]] = None,
+    completed: Optional[bool] = None,
+    skip: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+) -> dict:
+    logger.info(f"User {current_user.username} searching tasks for '{q}'")
+    now = datetime.now()
+    newLog = Log(
+        username=current_user.username,
+        endpoint="search_tasks",
+        time=now,
+        details={"q": q, "level": level, "completed": completed},
+    )
+    await audit_writer.write(newLog)
+
+    # username is the prefix of the text index, so only this user's terms are scanned
+    match = {"username": current_user.username, "$text": {"$search": q}}
+    if level:
+        match["level"] = level
+    if completed is not None:
+        match["completed"] = completed
+
+    model = _projection_model(fields)
+    scored = [
+        {"$match": match},
+        {"$project": {**_projection(model), "score": {"$meta": "textScore"}}},
+    ]
+    pipeline = [*scored]
+    if completed is not False:
+        archived = ArchivedTask.get_collection_name()
+        pipeline.append({"$unionWith": {"coll": archived, "pipeline": scored}})
+    results = await Task.aggregate(
+        [
+            *pipeline,
+            {"$sort": {"score": -1, "_id": -1}},
+            {"$skip": skip},
+            {"$limit": limit},
+        ]
+    ).to_list()
+
+    scores = [doc.pop("score") for doc in results]
+    tasks = [model.model_validate(doc) for doc in results]
+    if fields and "description" in fields:
+        await task_descriptions.hydrate(tasks)
+    items = [
+        {**jsonable_encoder(task), "score": score} for task, score in zip(tasks, scores)
+    ]
+    return {"items": items, "skip": skip, "limit": limit}
+
+
+# Export all of the user's tasks (archived ones included) as CSV or JSON,
+# streamed from the cursor a chunk at a time
+@task_router.get("/export", status_code=status.HTTP_200_OK)
+async def export_tasks(
+    current_user: Annotated[TokenData, Depends(get_user)],
+    format: Literal["csv", "json"] = "json",
+) -> StreamingResponse:
+    logger.info(f"User {current_user.username} exporting tasks as {format}")
+    now = datetime.now()
+    newLog = Log(
+        username=current_user.username,
+        endpoint="export_tasks",
+        time=now,
+        details={"format": format},
+    )
+    await audit_writer.write(newLog)
+
+    chunk_size = 500
+    queries = []
+    for source in (Task, ArchivedTask):
+        query = source.find(source.username == current_user.username)
+        query.pymongo_kwargs["batch_size"] = chunk_size
+        queries.append(query)
+
+    # Out-of-line descriptions can be large, so each task that has one goes
+    # out as a chunk of its own and only one is hydrated in memory at a time
+    async def chunks():
+        for query in queries:
+            chunk = []
+            async for task in query:
+                if task.description_external:
+                    if chunk:
+                        yield chunk
+                        chunk = []
+                    yield [task]
+                    continue
+                chunk.append(task)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    async def body():
+        if format == "csv":
+            yield csv_header()
+        else:
+            yield "["
+        first = True
+        async for chunk in chunks():
+            await task_descriptions.hydrate(chunk)
+            records = [task_record(task) for task in chunk]
+            if format == "csv":
+                yield csv_lines(records)
+            else:
+                lines = ",\n".join(json.dumps(record) for record in records)
+                yield ("\n" if first else ",\n") + lines
+            first = False
+        if format == "json":
+            yield "\n]\n"
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="tasks-{now:%Y%m%d}.{format}"'
+        },
+    )
+
+
+# Get one task, including its description
+@task_router.get(
+    "/{id}",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(etag_check("tasks"))],
+)
+async def get_task_by_id(
+    id: PydanticObjectId, current_user: Annotated[TokenData, Depends(get_user)]
+) -> Task:
+    logger.info(f"User {current_user.username} retrieving task {id}")
+    now = datetime.now()
+    newLog = Log(
+        username=current_user.username,
+        endpoint="get_task_by_id",
+        time=now,
+        details={"id": str(id)},
+    )
+    await audit_writer.write(newLog)
+
+    task = await Task.find_one(Task.id == id, Task.username == current_user.username)
+    if task is None:
+        task = await ArchivedTask.find_one(
+            ArchivedTask.id == id, ArchivedTask.username == current_user.username
+        )
+    if task is None:
+        await _raise_missing_or_forbidden(id, current_user, "view")
+    await task_descriptions.hydrate([task])
+    return task
+
+
 # POST
 # Create a task
 @task_router.post("/create", status_code=status.HTTP_201_CREATED)
@@ -129,18 +722,11 @@ async def create_task(
     logger.info(f"User {current_user.username} creating new {task.level}: {task.title}")
 
     # Depending on type of task, set the expired_date (when you would need to re-evaluate its category)
-    if not task.expired_date:
-        if task.level == "task":
-            expired_date = task.created_date + timedelta(days=1)
-        elif task.level == "todo":
-            expired_date = task.created_date + timedelta(days=7)
-        elif task.level == "gottado":
-            expired_date = task.created_date + timedelta(days=30)
-    else:
-        expired_date = task.expired_date
+    expired_date = task.expired_date or task.created_date + LEVEL_DURATIONS[task.level]
 
+    encoded = await task_descriptions.encode(task.description)
     newTask = Task(
-        description=task.description,
+        **encoded.task_fields,
         title=task.title,
         tags=task.tags,
         completed=task.completed,
@@ -161,46 +747,217 @@ async def create_task(
     )
 
     await Task.insert_one(newTask)
-    await Log.insert_one(newLog)
+    if encoded.data is not None:
+        await task_descriptions.save(newTask.id, current_user.username, encoded)
+    task_cache.invalidate(current_user.username)
+    await task_counters.record(current_user.username, None, newTask)
+    await audit_writer.write(newLog)
     logger.info(f"Task created successfully: {newTask.id}")
-    return newTask
+    return newTask.model_copy(update={"description": task.description})
 
 
-# DELETE
-# Delete by ID
-@task_router.delete("/{id}")
-async def delete_task_by_id(
-    id: PydanticObjectId, current_user: Annotated[TokenData, Depends(get_user)]
+# Import tasks from a CSV, JSON or NDJSON upload
+# Rows are validated against TaskRequest and inserted with insert_many in
+# chunks; invalid rows are skipped and reported. One audit log for the import.
+@task_router.post("/import", status_code=status.HTTP_201_CREATED)
+async def import_tasks(
+    file: UploadFile, current_user: Annotated[TokenData, Depends(get_user)]
 ) -> dict:
-    logger.info(f"User {current_user.username} attempting to delete task {id}")
-    task = await Task.get(id)
+    format = import_format(file.filename)
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload a .csv, .json, .ndjson or .jsonl file",
+        )
+    logger.info(f"User {current_user.username} importing tasks from {file.filename}")
+
+    settings = get_settings()
+    imported = 0
+    failed = 0
+    errors = []
+    truncated = False
+    rows = read_rows(file.file, format, settings.import_chunk_size)
+
+    while True:
+        try:
+            # Parsing reads the spooled upload, keep it off the event loop
+            chunk = await asyncio.to_thread(next, rows, None)
+        except (ValueError, csv.Error) as e:
+            logger.warning(f"Import from {file.filename} stopped: {str(e)}")
+            errors.append({"row": None, "error": f"Could not parse file: {str(e)}"})
+            break
+        if chunk is None:
+            break
+
+        tasks = []
+        descriptions = []
+        for row_number, row in chunk:
+            if imported + len(tasks) >= settings.import_max_rows:
+                truncated = True
+                break
+            try:
+                if isinstance(row, str):
+                    task = TaskRequest.model_validate_json(row)
+                else:
+                    task = TaskRequest.model_validate(row)
+                if task.level not in LEVEL_DURATIONS:
+                    raise ValueError(f"Unknown level '{task.level}'")
+            except (ValidationError, ValueError) as e:
+                failed += 1
+                if len(errors) < 100:
+                    errors.append({"row": row_number, "error": str(e)})
+                continue
+
+            encoded = await task_descriptions.encode(task.description)
+            newTask = Task(
+                **{**task.model_dump(), **encoded.task_fields},
+                id=PydanticObjectId(),
+                username=current_user.username,
+            )
+            tasks.append(newTask)
+            if encoded.data is not None:
+                descriptions.append((newTask.id, encoded))
+
+        if tasks:
+            await Task.insert_many(tasks)
+            for task_id, encoded in descriptions:
+                await task_descriptions.save(task_id, current_user.username, encoded)
+            imported += len(tasks)
+        if truncated:
+            errors.append(
+                {
+                    "row": None,
+                    "error": f"Stopped after {settings.import_max_rows} tasks",
+                }
+            )
+            break
+
+    if imported:
+        task_cache.invalidate(current_user.username)
+        await task_counters.reconcile(current_user.username)
 
-    if not task:
+    now = datetime.now()
+    newLog = Log(
+        username=current_user.username,
+        endpoint="import_tasks",
+        time=now,
+        details={
+            "filename": file.filename,
+            "format": format,
+            "imported": imported,
+            "failed": failed,
+        },
+    )
+    await audit_writer.write(newLog)
+    logger.info(
+        f"Imported {imported} tasks for {current_user.username} ({failed} rows failed)"
+    )
+    return {
+        "imported": imported,
+        "failed": failed,
+        "truncated": truncated,
+        "errors": errors,
+    }
+
+
+# Shared helpers for the single-task write endpoints.
+# Each write filters on both _id and username, so the ownership check and the
+# write happen in the same round trip. Only when nothing matched do we look
+# the task up again to tell "not found" from "not yours".
+async def _raise_missing_or_forbidden(
+    id: PydanticObjectId, current_user: TokenData, action: str
+):
+    owner = await Task.find_one(Task.id == id).project(TaskOwnerOnly)
+    if not owner:
+        owner = await ArchivedTask.find_one(ArchivedTask.id == id).project(
+            TaskOwnerOnly
+        )
+    if not owner:
         logger.warning(f"Task with ID={id} not found")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID={id} not found"
         )
 
-    # Check if the task belongs to the current user
-    if task.username != current_user.username:
-        logger.warning(
-            f"User {current_user.username} attempted to delete task {id} belonging to {task.username}"
+    logger.warning(
+        f"User {current_user.username} attempted to {action} task {id} belonging to {owner.username}"
+    )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"You don't have permission to {action} this task",
+    )
+
+
+# Atomically apply `update` (an update document or pipeline) to one of the
+# user's tasks with find_one_and_update. Returns the task as it was before the
+# update, without its description (up to a megabyte that nothing here reads);
+# callers build the updated task from the values they just wrote.
+# Archived tasks are updated in tasks_archive, and moved back if reopened.
+async def _update_own_task(
+    id: PydanticObjectId, current_user: TokenData, update: dict | list
+) -> TaskWithoutDescription:
+    task_filter = {"_id": id, "username": current_user.username}
+    projection = _projection(TaskWithoutDescription)
+    before = await Task.get_motor_collection().find_one_and_update(
+        task_filter,
+        update,
+        projection=projection,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        before = await ArchivedTask.get_motor_collection().find_one_and_update(
+            task_filter,
+            update,
+            projection=projection,
+            return_document=ReturnDocument.BEFORE,
         )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to delete this task",
+        if before is not None:
+            await task_archiver.restore_reopened([id])
+    if before is None:
+        await _raise_missing_or_forbidden(id, current_user, "update")
+    task_cache.invalidate(current_user.username)
+    return TaskWithoutDescription.model_validate(before)
+
+
+# DELETE
+# Delete by ID
+@task_router.delete("/{id}")
+async def delete_task_by_id(
+    id: PydanticObjectId, current_user: Annotated[TokenData, Depends(get_user)]
+) -> dict:
+    logger.info(f"User {current_user.username} attempting to delete task {id}")
+    # Title for the audit log, the rest for the task counters and descriptions
+    projection = {
+        "title": 1,
+        "description_external": 1,
+        **{field: 1 for field in TaskCountedOnly.model_fields},
+    }
+    task = await Task.get_motor_collection().find_one_and_delete(
+        {"_id": id, "username": current_user.username}, projection=projection
+    )
+    if task is None:
+        # Archived history can be deleted too
+        task = await ArchivedTask.get_motor_collection().find_one_and_delete(
+            {"_id": id, "username": current_user.username}, projection=projection
         )
+    if task is None:
+        await _raise_missing_or_forbidden(id, current_user, "delete")
+    task_cache.invalidate(current_user.username)
+    await task_counters.record(
+        current_user.username, TaskCountedOnly.model_validate(task), None
+    )
+    if task.get("description_external"):
+        await task_descriptions.delete([id])
+    # The task's files are removed in the background
+    garbage_collector.delete_tasks(current_user.username, [id])
 
     now = datetime.now()
     newLog = Log(
         username=current_user.username,
         endpoint="delete_task",
         time=now,
-        details={"id": str(id), "title": task.title},
+        details={"id": str(id), "title": task["title"]},
     )
-
-    await task.delete()
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
     logger.info(f"Task {id} deleted successfully")
     return {"message": f"The todo with ID={id} has been deleted."}
 
@@ -212,34 +969,15 @@ async def update_task_title(
     id: PydanticObjectId,
     title: Annotated[str, Body(..., min_length=3, max_length=50)],
     current_user: Annotated[TokenData, Depends(get_user)],
-) -> Task:
+) -> TaskWithoutDescription:
     logger.info(
         f"User {current_user.username} attempting to update title for task {id}"
     )
-    existing_task = await Task.get(id)
-    if not existing_task:
-        logger.warning(f"Task with ID={id} not found")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID={id} not found"
-        )
-
-    # Check if the task belongs to the current user
-    if existing_task.username != current_user.username:
-        logger.warning(
-            f"User {current_user.username} attempted to update task {id} belonging to {existing_task.username}"
-        )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this task",
-        )
+    existing_task = await _update_own_task(id, current_user, {"$set": {"title": title}})
 
     # Save original title for logging
     original_title = existing_task.title
 
-    # Update the title
-    existing_task.title = title
-    await existing_task.save()
-
     # Log the update action
     now = datetime.now()
     newLog = Log(
@@ -252,9 +990,9 @@ async def update_task_title(
             "new_title": title,
         },
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
     logger.info(f"Updated title for task {id} from '{original_title}' to '{title}'")
-    return existing_task
+    return existing_task.model_copy(update={"title": title})
 
 
 # Update description
@@ -264,18 +1002,12 @@ async def update_task_desc(
     desc: Annotated[str, Body(..., min_length=0, max_length=1000000)],
     current_user: Annotated[TokenData, Depends(get_user)],
 ) -> Task:
-    existing_task = await Task.get(id)
-    if not existing_task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID={id} not found"
-        )
-
-    # Check if the task belongs to the current user
-    if existing_task.username != current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this task",
-        )
+    encoded = await task_descriptions.encode(desc)
+    existing_task = await _update_own_task(
+        id, current_user, {"$set": encoded.task_fields}
+    )
+    if encoded.data is not None or existing_task.description_external:
+        await task_descriptions.save(id, current_user.username, encoded)
 
     now = datetime.now()
     newLog = Log(
@@ -284,11 +1016,14 @@ async def update_task_desc(
         time=now,
         details={"id": str(id), "title": existing_task.title},
     )
-
-    existing_task.description = desc
-    await existing_task.save()
-    await Log.insert_one(newLog)
-    return existing_task
+    await audit_writer.write(newLog)
+    return Task.model_validate(
+        {
+            **existing_task.model_dump(),
+            **encoded.task_fields,
+            "description": desc,
+        }
+    )
 
 
 # Update expire date (used for keeping the task within its current bucket upon expiration)
@@ -303,19 +1038,10 @@ async def update_task_expired_date(
         ),
     ],
     current_user: Annotated[TokenData, Depends(get_user)],
-) -> Task:
-    existing_task = await Task.get(id)
-    if not existing_task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID={id} not found"
-        )
-
-    # Check if the task belongs to the current user
-    if existing_task.username != current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this task",
-        )
+) -> TaskWithoutDescription:
+    existing_task = await _update_own_task(
+        id, current_user, {"$set": {"expired_date": expired_date}}
+    )
 
     now = datetime.now()
     newLog = Log(
@@ -329,32 +1055,20 @@ async def update_task_expired_date(
             "new_expired_date": expired_date.isoformat(),
         },
     )
-
-    existing_task.expired_date = expired_date
-    await existing_task.save()
-    await Log.insert_one(newLog)
-    return existing_task
+    await audit_writer.write(newLog)
+    return existing_task.model_copy(update={"expired_date": expired_date})
 
 
 # Update the completed date (when the boolean flips from 0 -> 1)
 @task_router.patch("/completed_date/{id}", status_code=status.HTTP_202_ACCEPTED)
 async def update_task_completed_date(
     id: PydanticObjectId, current_user: Annotated[TokenData, Depends(get_user)]
-) -> Task:
+) -> TaskWithoutDescription:
     # Get the current time and make it the completed_date.
     completed_date = datetime.now()
-    existing_task = await Task.get(id)
-    if not existing_task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID={id} not found"
-        )
-
-    # Check if the task belongs to the current user
-    if existing_task.username != current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this task",
-        )
+    existing_task = await _update_own_task(
+        id, current_user, {"$set": {"completed_date": completed_date}}
+    )
 
     now = datetime.now()
     newLog = Log(
@@ -368,30 +1082,22 @@ async def update_task_completed_date(
             "new_completed_date": completed_date.isoformat(),
         },
     )
-
-    existing_task.completed_date = completed_date
-    await existing_task.save()
-    await Log.insert_one(newLog)
-    return existing_task
+    await audit_writer.write(newLog)
+    updated_task = existing_task.model_copy(update={"completed_date": completed_date})
+    await task_counters.record(current_user.username, existing_task, updated_task)
+    return updated_task
 
 
 @task_router.patch("/high_priority/{id}", status_code=status.HTTP_202_ACCEPTED)
 async def update_task_priority(
     id: PydanticObjectId, current_user: Annotated[TokenData, Depends(get_user)]
-) -> Task:
-    existing_task = await Task.get(id)
-    if not existing_task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID={id} not found"
-        )
-
-    # Check if the task belongs to the current user
-    if existing_task.username != current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this task",
-        )
-
+) -> TaskWithoutDescription:
+    # Toggle on the server with an update pipeline so concurrent clicks can't race
+    existing_task = await _update_own_task(
+        id,
+        current_user,
+        [{"$set": {"high_priority": {"$not": "$high_priority"}}}],
+    )
     new_priority = not existing_task.high_priority
 
     now = datetime.now()
@@ -406,33 +1112,32 @@ async def update_task_priority(
             "new_priority": new_priority,
         },
     )
-
-    existing_task.high_priority = new_priority
-    await existing_task.save()
-    await Log.insert_one(newLog)
-    return existing_task
+    await audit_writer.write(newLog)
+    updated_task = existing_task.model_copy(update={"high_priority": new_priority})
+    await task_counters.record(current_user.username, existing_task, updated_task)
+    return updated_task
 
 
 @task_router.patch("/completed/{id}", status_code=status.HTTP_202_ACCEPTED)
 async def update_task_completion(
     id: PydanticObjectId, current_user: Annotated[TokenData, Depends(get_user)]
-) -> Task:
-    existing_task = await Task.get(id)
-    if not existing_task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID={id} not found"
-        )
-
-    # Check if the task belongs to the current user
-    if existing_task.username != current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this task",
-        )
-
+) -> TaskWithoutDescription:
+    now = datetime.now()
+    # Toggle completed and stamp completed_date only when it flips to True
+    existing_task = await _update_own_task(
+        id,
+        current_user,
+        [
+            {
+                "$set": {
+                    "completed": {"$not": "$completed"},
+                    "completed_date": {"$cond": ["$completed", "$completed_date", now]},
+                }
+            }
+        ],
+    )
     new_completion = not existing_task.completed
 
-    now = datetime.now()
     newLog = Log(
         username=current_user.username,
         endpoint="update_task_completion",
@@ -444,15 +1149,15 @@ async def update_task_completion(
             "new_completed": new_completion,
         },
     )
+    await audit_writer.write(newLog)
 
-    existing_task.completed = new_completion
+    changes = {"completed": new_completion}
     # Update completed_date if task is being marked as completed
     if new_completion:
-        existing_task.completed_date = datetime.now()
-
-    await existing_task.save()
-    await Log.insert_one(newLog)
-    return existing_task
+        changes["completed_date"] = now
+    updated_task = existing_task.model_copy(update=changes)
+    await task_counters.record(current_user.username, existing_task, updated_task)
+    return updated_task
 
 
 @task_router.patch("/level/{id}", status_code=status.HTTP_202_ACCEPTED)
@@ -460,21 +1165,16 @@ async def update_task_level(
     id: PydanticObjectId,
     level: Literal["task", "todo", "gottado"],
     current_user: Annotated[TokenData, Depends(get_user)],
-) -> Task:
-    existing_task = await Task.get(id)
-    if not existing_task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID={id} not found"
-        )
-
-    # Check if the task belongs to the current user
-    if existing_task.username != current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this task",
-        )
-
+) -> TaskWithoutDescription:
     now = datetime.now()
+    # Update expired_date based on new level
+    expired_date = now + LEVEL_DURATIONS[level]
+    existing_task = await _update_own_task(
+        id,
+        current_user,
+        {"$set": {"level": level, "expired_date": expired_date}},
+    )
+
     newLog = Log(
         username=current_user.username,
         endpoint="update_task_level",
@@ -486,17 +1186,140 @@ async def update_task_level(
             "new_level": level,
         },
     )
+    await audit_writer.write(newLog)
+    updated_task = existing_task.model_copy(
+        update={"level": level, "expired_date": expired_date}
+    )
+    await task_counters.record(current_user.username, existing_task, updated_task)
+    return updated_task
 
-    # Update expired_date based on new level
-    if level == "task":
-        expired_date = now + timedelta(days=1)
-    elif level == "todo":
-        expired_date = now + timedelta(days=7)
-    elif level == "gottado":
-        expired_date = now + timedelta(days=30)
-
-    existing_task.level = level
-    existing_task.expired_date = expired_date
-    await existing_task.save()
-    await Log.insert_one(newLog)
-    return existing_task
+
+# BULK
+# Apply many updates/deletes in one ownership query and one bulk_write
+@task_router.patch("/bulk", status_code=status.HTTP_202_ACCEPTED)
+async def bulk_update_tasks(
+    bulk: TaskBulkRequest, current_user: Annotated[TokenData, Depends(get_user)]
+) -> dict:
+    operations = bulk.operations
+    logger.info(
+        f"User {current_user.username} applying {len(operations)} bulk task operations"
+    )
+
+    # Check ownership of every task with a single $in query (per collection;
+    # archived tasks are written in tasks_archive)
+    ids = list({op.id for op in operations})
+    owners = {
+        task.id: task.username
+        for task in await Task.find(In(Task.id, ids)).project(TaskOwnerOnly).to_list()
+    }
+    missing = [id for id in ids if id not in owners]
+    archived = set()
+    if missing:
+        for task in (
+            await ArchivedTask.find(In(ArchivedTask.id, missing))
+            .project(TaskOwnerOnly)
+            .to_list()
+        ):
+            owners[task.id] = task.username
+            archived.add(task.id)
+
+    now = datetime.now()
+    results = []
+    # collection -> (writes, index into results for each write)
+    writes = {Task: ([], []), ArchivedTask: ([], [])}
+    descriptions = []  # (index into results, task id, encoded description)
+    for op in operations:
+        result = {"id": str(op.id)}
+        results.append(result)
+
+        if op.id not in owners:
+            result["status"] = "not_found"
+            continue
+        if owners[op.id] != current_user.username:
+            logger.warning(
+                f"User {current_user.username} attempted a bulk update on task {op.id} belonging to {owners[op.id]}"
+            )
+            result["status"] = "forbidden"
+            continue
+
+        task_filter = {"_id": op.id, "username": current_user.username}
+        model_writes, write_positions = writes[
+            ArchivedTask if op.id in archived else Task
+        ]
+        if op.delete:
+            model_writes.append(DeleteOne(task_filter))
+            result["status"] = "deleted"
+        else:
+            changes = op.model_dump(
+                exclude={"id", "delete"}, exclude_none=True, exclude_unset=True
+            )
+            if not changes:
+                result["status"] = "unchanged"
+                continue
+            # Same side effects as the single-task PATCH endpoints
+            if "level" in changes and "expired_date" not in changes:
+                changes["expired_date"] = now + LEVEL_DURATIONS[changes["level"]]
+            if changes.get("completed"):
+                changes["completed_date"] = now
+            if "description" in changes:
+                encoded = await task_descriptions.encode(changes.pop("description"))
+                changes.update(encoded.task_fields)
+                descriptions.append((len(results) - 1, op.id, encoded))
+            model_writes.append(UpdateOne(task_filter, {"$set": changes}))
+            result["status"] = "updated"
+        write_positions.append(len(results) - 1)
+
+    # Operations run in request order per collection; everything after a
+    # failed write is skipped
+    for model, (model_writes, write_positions) in writes.items():
+        if not model_writes:
+            continue
+        try:
+            await model.get_motor_collection().bulk_write(model_writes, ordered=True)
+        except BulkWriteError as e:
+            failed_at = e.details["writeErrors"][0]["index"]
+            logger.error(f"Bulk task write failed at operation {failed_at}: {str(e)}")
+            for position, result_index in enumerate(write_positions):
+                if position == failed_at:
+                    results[result_index]["status"] = "error"
+                elif position > failed_at:
+                    results[result_index]["status"] = "skipped"
+    if archived:
+        await task_archiver.restore_reopened(
+            [
+                op.id
+                for op, result in zip(operations, results)
+                if op.id in archived and result["status"] == "updated"
+            ]
+        )
+
+    if any(model_writes for model_writes, _ in writes.values()):
+        # Some writes may have landed even if the batch failed part way
+        task_cache.invalidate(current_user.username)
+        for result_index, task_id, encoded in descriptions:
+            if results[result_index]["status"] == "updated":
+                await task_descriptions.save(task_id, current_user.username, encoded)
+        deleted_ids = [
+            op.id
+            for op, result in zip(operations, results)
+            if result["status"] == "deleted"
+        ]
+        await task_descriptions.delete(deleted_ids)
+        garbage_collector.delete_tasks(current_user.username, deleted_ids)
+        # Recount rather than track every operation's before/after state
+        await task_counters.reconcile(current_user.username)
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    newLog = Log(
+        username=current_user.username,
+        endpoint="bulk_update_tasks",
+        time=now,
+        details={"operations": len(operations), "results": counts},
+    )
+    await audit_writer.write(newLog)
+
+    logger.info(f"Bulk task operations for {current_user.username}: {counts}")
+    return {"results": results, "counts": counts}
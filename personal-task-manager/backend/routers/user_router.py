@@ -1,46 +1,37 @@
 # GET FROM HIS DEMO
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from passlib.context import CryptContext
-
-from auth.jwt_auth import Token, TokenData, create_access_token, decode_jwt_token
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from pymongo.errors import DuplicateKeyError
+
+from auth.jwt_auth import (
+    RefreshRequest,
+    Token,
+    TokenData,
+    create_access_token,
+    create_refresh_token,
+    decode_jwt_token,
+    get_user,
+    new_token_family,
+    refresh_token_lifetime,
+    require_admin,
+)
 from models.user import User, UserRequest
 from models.log import Log
-from datetime import datetime
+from services.audit_writer import audit_writer
+from services.garbage_collector import garbage_collector
+from services.password_hasher import password_hasher
+from services.role_cache import role_cache
+from services.signin_limiter import signin_limiter
+from services.token_denylist import token_denylist
+from datetime import datetime, timezone
+import asyncio
 import logging
+import math
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"])
-
-
-class HashPassword:
-    def create_hash(self, password: str):
-        return pwd_context.hash(password)
-
-    def verify_hash(self, input_password: str, hashed_password: str):
-        return pwd_context.verify(input_password, hashed_password)
-
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/sign-in")
-hash_password = HashPassword()
-
-
-def get_user(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
-    print(token)
-    token_data = decode_jwt_token(token)
-    if not token_data:
-        logger.warning("Invalid token or token expired")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return token_data
-
-
 user_router = APIRouter()
 
 
@@ -53,7 +44,15 @@ async def sign_up(user: UserRequest):
         logger.warning(f"Signup failed - username already exists: {user.username}")
         raise HTTPException(status_code=400, detail="User already exists.")
 
-    hashed_password = hash_password.create_hash(user.password)
+    # A deleted user's data is removed in the background; don't hand it over
+    if garbage_collector.is_pending(user.username):
+        logger.warning(f"Signup failed - username still being deleted: {user.username}")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This username was just deleted, try again in a moment.",
+        )
+
+    hashed_password = await password_hasher.hash(user.password)
     if user.username == "gabe":
         new_user = User(
             username=user.username,
@@ -68,7 +67,13 @@ async def sign_up(user: UserRequest):
             email=user.email,
             role="user",
         )
-    await new_user.create()
+    try:
+        await new_user.create()
+    except DuplicateKeyError:
+        # A concurrent sign-up took the username after the check above
+        logger.warning(f"Signup failed - username already exists: {user.username}")
+        raise HTTPException(status_code=400, detail="User already exists.")
+    role_cache.invalidate(user.username)
     logger.info(f"User created successfully: {user.username}, role: {new_user.role}")
 
     # Log the signup action
@@ -79,13 +84,14 @@ async def sign_up(user: UserRequest):
         time=now,
         details={"email": user.email, "role": new_user.role},
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     return {"message": "User created successfully", "user": new_user}
 
 
 @user_router.post("/sign-in")
 async def login_for_access_token(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
     logger.info(f"Sign-in attempt for username: {form_data.username}")
@@ -93,21 +99,49 @@ async def login_for_access_token(
     username = (
         form_data.username
     )  # might need trim() or sanitization for trailing whitespace
+    client_ip = request.client.host if request.client else None
+
+    # Throttled before any lookup or bcrypt work
+    retry_after = signin_limiter.check(username, client_ip)
+    if retry_after:
+        logger.warning(f"Sign-in throttled for username: {username} ({client_ip})")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed sign-in attempts, try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    # A username under attack from many IPs slows down, but stays usable
+    delay = signin_limiter.delay(username)
+    if delay:
+        await asyncio.sleep(delay)
+
     existing_user = await User.find_one(User.username == username)
     if not existing_user:
+        signin_limiter.failure(username, client_ip)
         logger.warning(f"Sign-in failed - user not found: {username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Username or Password is not valid.",
         )
 
-    authenticated = hash_password.verify_hash(
+    authenticated, new_hash = await password_hasher.verify_and_update(
         form_data.password, existing_user.password
     )
     if authenticated:
+        signin_limiter.success(username, client_ip)
+        if new_hash:
+            # Stored with another bcrypt cost than bcrypt_rounds; upgrade it now
+            # that we have the plaintext
+            await existing_user.set({User.password: new_hash})
+            logger.info(f"Rehashed password of {username} to the current cost")
         logger.info(f"User {username} logged in successfully")
         role = existing_user.role
-        access_token = create_access_token({"username": username, "role": role})
+        # Every token refreshed from this sign-in shares the family
+        family = new_token_family()
+        access_token = create_access_token(
+            {"username": username, "role": role, "fam": family}
+        )
+        refresh_token = create_refresh_token(username, family)
         # Log the successful login
         now = datetime.now()
         newLog = Log(
@@ -116,10 +150,11 @@ async def login_for_access_token(
             time=now,
             details={"action": "successful_login"},
         )
-        await Log.insert_one(newLog)
-        return Token(access_token=access_token)
+        await audit_writer.write(newLog)
+        return Token(access_token=access_token, refresh_token=refresh_token)
 
     # Log the failed login attempt
+    signin_limiter.failure(username, client_ip)
     logger.warning(f"Sign-in failed - invalid password for user: {username}")
     now = datetime.now()
     newLog = Log(
@@ -128,16 +163,97 @@ async def login_for_access_token(
         time=now,
         details={"action": "failed_login_attempt"},
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
-    return HTTPException(status_code=401, detail="Username or Password is not valid.")
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Username or Password is not valid.",
+    )
+
+
+@user_router.post("/refresh")
+async def refresh_access_token(body: RefreshRequest) -> Token:
+    token_data = decode_jwt_token(body.refresh_token)
+    if (
+        not token_data
+        or token_data.token_type != "refresh"
+        or token_denylist.is_revoked(token_data.family)
+    ):
+        logger.warning("Refresh failed - invalid, expired or revoked refresh token")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    username = token_data.username
+    logger.info(f"Token refresh for username: {username}")
+
+    # Rotation: each refresh token works once. Seeing one again means it was
+    # stolen (or raced), so the whole sign-in session is revoked.
+    reused = token_denylist.is_revoked(token_data.jti) or not (
+        await token_denylist.revoke(
+            token_data.jti,
+            username,
+            token_data.exp_datetime.astimezone(timezone.utc),
+        )
+    )
+    if reused:
+        await token_denylist.revoke(
+            token_data.family,
+            username,
+            datetime.now(timezone.utc) + refresh_token_lifetime(),
+        )
+        logger.warning(f"Refresh token reused for {username}, session revoked")
+        now = datetime.now()
+        newLog = Log(
+            username=username,
+            endpoint="refresh",
+            time=now,
+            details={"action": "refresh_token_reuse"},
+        )
+        await audit_writer.write(newLog)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # The role may have changed since sign-in; a deleted user gets nothing
+    role = await role_cache.get(username)
+    if role is None:
+        logger.warning(f"Refresh failed - user not found: {username}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    access_token = create_access_token(
+        {"username": username, "role": role, "fam": token_data.family}
+    )
+    refresh_token = create_refresh_token(username, token_data.family)
+    return Token(access_token=access_token, refresh_token=refresh_token)
 
 
 @user_router.post("/logout")
 async def logout(current_user: Annotated[TokenData, Depends(get_user)]):
     logger.info(f"User {current_user.username} logging out")
-    # Log the logout action for auditing purposes
+    # Revoke the session: this access token and every refresh token from the
+    # same sign-in (tokens from before families existed only by jti)
+    if current_user.family:
+        await token_denylist.revoke(
+            current_user.family,
+            current_user.username,
+            datetime.now(timezone.utc) + refresh_token_lifetime(),
+        )
+    elif current_user.jti:
+        await token_denylist.revoke(
+            current_user.jti,
+            current_user.username,
+            current_user.exp_datetime.astimezone(timezone.utc),
+        )
 
+    # Log the logout action for auditing purposes
     now = datetime.now()
     newLog = Log(
         username=current_user.username,
@@ -145,26 +261,15 @@ async def logout(current_user: Annotated[TokenData, Depends(get_user)]):
         time=now,
         details={"action": "user_logout"},
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     return {"message": "Logged out successfully"}
 
 
 # Admin-only endpoints for user management
 @user_router.get("/all")
-async def get_all_users(current_user: Annotated[TokenData, Depends(get_user)]):
+async def get_all_users(current_user: Annotated[TokenData, Depends(require_admin)]):
     logger.info(f"User {current_user.username} attempting to get all users")
-    # Verify the user is an admin
-    user = await User.find_one(User.username == current_user.username)
-    if not user or user.role != "admin":
-        logger.warning(
-            f"User {current_user.username} attempted to access admin endpoint without permission"
-        )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin privileges required",
-        )
-
     # Log the admin action
     now = datetime.now()
     newLog = Log(
@@ -173,7 +278,7 @@ async def get_all_users(current_user: Annotated[TokenData, Depends(get_user)]):
         time=now,
         details={"action": "admin_view_all_users"},
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     # Fetch all users without returning password hashes
     all_users = await User.find_all().to_list()
@@ -192,22 +297,11 @@ async def get_all_users(current_user: Annotated[TokenData, Depends(get_user)]):
 async def update_user_role(
     username: str,
     role: str,
-    current_user: Annotated[TokenData, Depends(get_user)],
+    current_user: Annotated[TokenData, Depends(require_admin)],
 ):
     logger.info(
         f"User {current_user.username} attempting to update role for user {username} to {role}"
     )
-    # Verify the user is an admin
-    admin = await User.find_one(User.username == current_user.username)
-    if not admin or admin.role != "admin":
-        logger.warning(
-            f"User {current_user.username} attempted to update role without admin privileges"
-        )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin privileges required",
-        )
-
     # Validate role
     if role not in ["user", "admin"]:
         logger.warning(f"Invalid role attempted: {role}")
@@ -238,6 +332,7 @@ async def update_user_role(
     # Update the role
     user_to_update.role = role
     await user_to_update.save()
+    role_cache.invalidate(username)
 
     # Log the admin action
     now = datetime.now()
@@ -250,7 +345,7 @@ async def update_user_role(
             "new_role": role,
         },
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     return {"message": f"User {username} role updated to {role}"}
 
@@ -258,20 +353,9 @@ async def update_user_role(
 @user_router.delete("/{username}")
 async def delete_user(
     username: str,
-    current_user: Annotated[TokenData, Depends(get_user)],
+    current_user: Annotated[TokenData, Depends(require_admin)],
 ):
     logger.info(f"User {current_user.username} attempting to delete user: {username}")
-    # Verify the user is an admin
-    admin = await User.find_one(User.username == current_user.username)
-    if not admin or admin.role != "admin":
-        logger.warning(
-            f"User {current_user.username} attempted to delete user without admin privileges"
-        )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin privileges required",
-        )
-
     # Find the user to delete
     user_to_delete = await User.find_one(User.username == username)
     if not user_to_delete:
@@ -292,6 +376,9 @@ async def delete_user(
         )
 
     await user_to_delete.delete()
+    role_cache.invalidate(username)
+    # Their tasks, files, budget data and logs are removed in the background
+    garbage_collector.delete_user(username)
     logger.info(
         f"User {username} successfully deleted by admin {current_user.username}"
     )
@@ -306,6 +393,6 @@ async def delete_user(
             "target_user": username,
         },
     )
-    await Log.insert_one(newLog)
+    await audit_writer.write(newLog)
 
     return {"message": f"User {username} deleted."}
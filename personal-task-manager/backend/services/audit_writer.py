@@ -0,0 +1,160 @@
+# BATCHED AUDIT LOG WRITER
+#
+# Handlers hand their Log documents to the writer instead of awaiting
+# Log.insert_one themselves. A background task started in main.lifespan
+# drains the queue and writes the documents with insert_many whenever a
+# batch fills up or the flush interval runs out.
+
+import asyncio
+import logging
+import time
+
+from models.log import Log
+from models.my_config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    def __init__(
+        self,
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.05,
+    ):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._running = False
+
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.direct_writes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    async def start(self):
+        """Start the background flusher (called from main.lifespan)"""
+        if self._running:
+            return
+        settings = get_settings()
+        self.max_queue_size = settings.audit_queue_size
+        self.batch_size = settings.audit_batch_size
+        self.flush_interval = settings.audit_flush_interval_ms / 1000
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._running = True
+        self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+        logger.info(
+            f"Audit log writer started (batch_size={self.batch_size}, "
+            f"flush_interval={self.flush_interval * 1000:.0f}ms, queue={self.max_queue_size})"
+        )
+
+    async def stop(self):
+        """Stop accepting new entries and flush everything still queued"""
+        if not self._running:
+            return
+        self._running = False
+        # The sentinel sits behind every queued log, so the flusher drains them first
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        # Anything that squeezed in behind the sentinel while waiting on a full queue
+        leftovers = []
+        while not self._queue.empty():
+            log = self._queue.get_nowait()
+            if log is not None:
+                leftovers.append(log)
+        if leftovers:
+            await self._flush(leftovers)
+        logger.info(f"Audit log writer stopped ({self.written} logs written)")
+
+    async def write(self, log: Log):
+        """Queue a log for the next batch.
+
+        If the queue is full the caller waits for room rather than dropping the
+        entry. Without a running flusher (scripts, tests) the log is inserted
+        directly.
+        """
+        if not self._running:
+            self.direct_writes += 1
+            await Log.insert_one(log)
+            return
+
+        try:
+            self._queue.put_nowait(log)
+        except asyncio.QueueFull:
+            self.backpressure_waits += 1
+            if self.backpressure_waits % 1000 == 1:
+                logger.warning(
+                    f"Audit log queue is full, waiting for the flusher "
+                    f"({self.backpressure_waits} waits so far)"
+                )
+            await self._queue.put(log)
+        self.enqueued += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    log = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if log is None:
+                    stopping = True
+                    break
+                batch.append(log)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[Log]):
+        started = time.perf_counter()
+        try:
+            await Log.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} audit logs: {str(e)}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.max_queue_size,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "backpressure_waits": self.backpressure_waits,
+            "direct_writes": self.direct_writes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": (
+                round(self._total_flush_ms / self.batches, 2) if self.batches else 0.0
+            ),
+        }
+
+
+audit_writer = AuditLogWriter()
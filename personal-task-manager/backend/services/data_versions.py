@@ -0,0 +1,94 @@
+# PER-USER DATA VERSIONS AND ETAGS
+#
+# Each user has a version counter per data scope ("tasks", "files", "budget")
+# that every write to that scope bumps. Reads derive a weak ETag from the
+# counter, so a GET whose If-None-Match still matches can answer
+# 304 Not Modified without touching MongoDB.
+#
+# Counters live in this process. Local writes bump them directly; writes made
+# by other processes (other workers, their background jobs) arrive through
+# the event bus's MongoDB change stream and bump them too. The ETag carries a
+# per-process epoch, so tags issued before a restart (or by another worker)
+# never match by accident. Without a change stream (no replica set) other
+# processes' writes are invisible here, so ETags are then only issued when
+# etags_without_change_streams says this is the only process writing.
+# Every local bump is also published to the user's /events subscribers.
+
+import hashlib
+import uuid
+from datetime import date
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from auth.jwt_auth import TokenData, get_user
+from db.ndjson import wants_ndjson
+from models.my_config import get_settings
+from services.event_bus import event_bus
+
+
+class DataVersions:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions: dict[tuple[str, str], int] = {}
+        event_bus.change_listeners.append(self._changed)
+
+    def get(self, username: str, scope: str) -> int:
+        return self._versions.get((username, scope), 0)
+
+    def bump(self, username: str, scope: str):
+        self._changed(username, scope)
+        event_bus.publish(username, scope)
+
+    def _changed(self, username: str, scope: str):
+        self._versions[(username, scope)] = self.get(username, scope) + 1
+
+    def reliable(self) -> bool:
+        """Whether every write, from any process, reaches the counters"""
+        return (
+            event_bus.mode == "change_stream"
+            or get_settings().etags_without_change_streams
+        )
+
+    def etag(self, username: str, scope: str, *variant: str) -> str:
+        """Weak ETag for one view (path, query string...) of a user's data"""
+        digest = hashlib.sha1("|".join(variant).encode()).hexdigest()[:12]
+        return f'W/"{self.epoch}-{self.get(username, scope)}-{digest}"'
+
+
+data_versions = DataVersions()
+
+
+def etag_check(scope: str):
+    """Route dependency that answers 304 when If-None-Match is still current.
+
+    On a miss it sets the ETag on the response the handler returns.
+    NDJSON streams are not tagged, and nothing is while versions may miss
+    other processes' writes.
+    """
+
+    async def check(
+        request: Request,
+        response: Response,
+        current_user: TokenData = Depends(get_user),
+    ):
+        if wants_ndjson(request) or not data_versions.reliable():
+            return
+
+        # Today's date is part of the tag because some views default to "now"
+        # (e.g. the current month's budget summary)
+        tag = data_versions.etag(
+            current_user.username,
+            scope,
+            request.url.path,
+            request.url.query,
+            date.today().isoformat(),
+        )
+        headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if tag in [candidate.strip() for candidate in if_none_match.split(",")]:
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+        response.headers.update(headers)
+
+    return check
@@ -0,0 +1,261 @@
+# PER-USER CHANGE NOTIFICATIONS
+#
+# Feeds the /events Server-Sent Events endpoint. Subscribers are told which
+# data scope ("tasks", "files", "budget") changed and refetch it themselves,
+# instead of polling.
+#
+# Two sources publish into the bus:
+# - every local write, through data_versions.bump (works on a single node)
+# - a MongoDB change stream on tasks, files, ofx_files and transactions, when
+#   the server is a replica set, so writes made by other workers arrive too
+# For a scope whose deletes the change stream can attribute too (pre-images
+# enabled on its collections, which _watch does when events_pre_images is set)
+# local publishes are dropped and the stream echo is the only notification.
+# Otherwise local writes notify directly and their echo, if any, is coalesced
+# with the pending notification for the same scope. "files" always stays on
+# local publishes: its documents carry the file data, and a pre-image of every
+# deleted file would be a full extra copy written to config.system.preimages.
+
+import asyncio
+import logging
+from typing import Callable
+
+from pymongo.errors import OperationFailure
+
+from models.my_config import get_settings
+from models.task import Task
+
+logger = logging.getLogger(__name__)
+
+# Collection -> data scope (same scopes as services/data_versions.py)
+COLLECTION_SCOPES = {
+    "tasks": "tasks",
+    "files": "files",
+    "ofx_files": "budget",
+    "transactions": "budget",
+}
+
+# "$changeStream is only supported on replica sets"
+NOT_A_REPLICA_SET = 40573
+
+# Tried in order. Pre-images (MongoDB 6.0+, when enabled on the collection)
+# tell us who owned a deleted document; without them remote deletes are missed.
+WATCH_OPTIONS = [
+    {"full_document": "updateLookup", "full_document_before_change": "whenAvailable"},
+    {"full_document": "updateLookup"},
+]
+
+# Collections that get pre-images when events_pre_images is set
+PRE_IMAGE_COLLECTIONS = ["tasks", "ofx_files", "transactions"]
+
+RETRY_SECONDS = 30
+
+
+class Subscription:
+    def __init__(self, username: str, coalesce: float):
+        self.username = username
+        self.coalesce = coalesce
+        self.pending: set[str] = set()
+        self.closed = False
+        self._wake = asyncio.Event()
+
+    def notify(self, scope: str):
+        self.pending.add(scope)
+        self._wake.set()
+
+    def close(self):
+        self.closed = True
+        self._wake.set()
+
+    async def wait(self, timeout: float) -> set[str]:
+        """Scopes changed since the last call, or an empty set on timeout"""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            return set()
+        # Let a burst of writes (and their change stream echo) pile up
+        await asyncio.sleep(self.coalesce)
+        self._wake.clear()
+        scopes, self.pending = self.pending, set()
+        return scopes
+
+
+class EventBus:
+    def __init__(self, max_streams_per_user: int = 5, coalesce_ms: int = 100):
+        self.max_streams_per_user = max_streams_per_user
+        self.coalesce_ms = coalesce_ms
+        self.use_change_streams = True
+        self.mode = "local"
+        self.use_pre_images = False
+        # Scopes the change stream reports every write of, deletes included
+        self.stream_scopes: set[str] = set()
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._task: asyncio.Task | None = None
+        # Called with (username, scope) for every change stream event, i.e.
+        # writes from any process (data_versions keeps its ETags current)
+        self.change_listeners: list[Callable[[str, str], None]] = []
+
+        # Metrics
+        self.published = 0
+        self.local_skipped = 0
+        self.delivered = 0
+        self.change_events = 0
+        self.rejected = 0
+        self.errors = 0
+
+    async def start(self):
+        """Start watching MongoDB for changes (called from main.lifespan)"""
+        settings = get_settings()
+        self.max_streams_per_user = settings.events_max_streams_per_user
+        self.coalesce_ms = settings.events_coalesce_ms
+        self.use_change_streams = settings.events_change_streams
+        self.use_pre_images = settings.events_pre_images
+        if self.use_change_streams and not self._task:
+            self._task = asyncio.create_task(self._watch(), name="event-bus")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # End any /events streams still open
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.close()
+        self.mode = "local"
+        self.stream_scopes = set()
+
+    def subscribe(self, username: str) -> Subscription | None:
+        """None when the user already has max_streams_per_user streams open"""
+        subscriptions = self._subscribers.setdefault(username, set())
+        if len(subscriptions) >= self.max_streams_per_user:
+            self.rejected += 1
+            return None
+        subscription = Subscription(username, self.coalesce_ms / 1000)
+        subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.username)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.username]
+
+    def publish(self, username: str, scope: str):
+        """Notify the user's subscribers of a write made by this process"""
+        self.published += 1
+        if scope in self.stream_scopes:
+            # The change stream echo will notify them
+            self.local_skipped += 1
+            return
+        self._deliver(username, scope)
+
+    def _deliver(self, username: str, scope: str):
+        for subscription in self._subscribers.get(username, ()):
+            subscription.notify(scope)
+            self.delivered += 1
+
+    async def _watch(self):
+        database = Task.get_motor_collection().database
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": list(COLLECTION_SCOPES)}}},
+            # Only the owner is needed; never ship file contents over the stream
+            {
+                "$project": {
+                    "ns": 1,
+                    "fullDocument.username": 1,
+                    "fullDocumentBeforeChange.username": 1,
+                }
+            },
+        ]
+        options = 0
+        while True:
+            try:
+                pre_images = (
+                    self.use_pre_images
+                    and options == 0
+                    and await self._enable_pre_images(database)
+                )
+                async with database.watch(pipeline, **WATCH_OPTIONS[options]) as stream:
+                    self.mode = "change_stream"
+                    self.stream_scopes = (
+                        {COLLECTION_SCOPES[c] for c in PRE_IMAGE_COLLECTIONS}
+                        if pre_images
+                        else set()
+                    )
+                    logger.info(
+                        "Event bus following MongoDB change stream "
+                        f"({'with' if pre_images else 'without'} delete owners)"
+                    )
+                    async for change in stream:
+                        self._on_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == NOT_A_REPLICA_SET:
+                    logger.info("No replica set, event bus using local writes only")
+                    self.mode = "local"
+                    self.stream_scopes = set()
+                    return
+                if options + 1 < len(WATCH_OPTIONS):
+                    options += 1
+                    continue
+                self._watch_failed(e)
+            except Exception as e:
+                self._watch_failed(e)
+            await asyncio.sleep(RETRY_SECONDS)
+
+    async def _enable_pre_images(self, database) -> bool:
+        """Turn on pre-images for PRE_IMAGE_COLLECTIONS (MongoDB 6.0+)"""
+        try:
+            for collection in PRE_IMAGE_COLLECTIONS:
+                await database.command(
+                    "collMod",
+                    collection,
+                    changeStreamPreAndPostImages={"enabled": True},
+                )
+        except OperationFailure as e:
+            # Older server, missing collection or no collMod privilege
+            logger.info(f"Change stream pre-images unavailable: {str(e)}")
+            return False
+        return True
+
+    def _watch_failed(self, e: Exception):
+        self.errors += 1
+        self.mode = "local"
+        self.stream_scopes = set()
+        logger.warning(
+            f"Change stream unavailable, retrying in {RETRY_SECONDS}s: {str(e)}"
+        )
+
+    def _on_change(self, change: dict):
+        self.change_events += 1
+        scope = COLLECTION_SCOPES.get(change["ns"]["coll"])
+        document = change.get("fullDocument") or change.get("fullDocumentBeforeChange")
+        if scope and document and document.get("username"):
+            for listener in self.change_listeners:
+                listener(document["username"], scope)
+            self._deliver(document["username"], scope)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "stream_scopes": sorted(self.stream_scopes),
+            "users": len(self._subscribers),
+            "streams": sum(len(s) for s in self._subscribers.values()),
+            "max_streams_per_user": self.max_streams_per_user,
+            "published": self.published,
+            "local_skipped": self.local_skipped,
+            "delivered": self.delivered,
+            "change_events": self.change_events,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+event_bus = EventBus()
@@ -0,0 +1,162 @@
+# EXPIRY PROMOTION SCHEDULER
+#
+# Tasks move up a level (task -> todo -> gottado) once their expired_date
+# passes. A background task started in main.lifespan sweeps for expired,
+# uncompleted tasks every expiry_sweep_interval_seconds (a minute by default)
+# and promotes them in batches with update_many, instead of waiting for a
+# client to PATCH /level/{id}.
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+
+from beanie.operators import In, Set
+
+from models.log import Log
+from models.my_config import get_settings
+from models.task import LEVEL_DURATIONS, NEXT_LEVEL, Task, TaskOwnerOnly
+from services.audit_writer import audit_writer
+from services.task_cache import task_cache
+from services.task_counters import task_counters
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    def __init__(self, interval: float = 60, batch_size: int = 500):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+        # Metrics
+        self.sweeps = 0
+        self.errors = 0
+        self.total_promoted = 0
+        self.last_sweep_at: datetime | None = None
+        self.last_sweep_ms = 0.0
+        self.last_promoted: dict[str, int] = {}
+
+    async def start(self):
+        """Start the periodic sweep (called from main.lifespan)"""
+        if self._task:
+            return
+        settings = get_settings()
+        self.interval = settings.expiry_sweep_interval_seconds
+        self.batch_size = settings.expiry_sweep_batch_size
+        self._task = asyncio.create_task(self._run(), name="expiry-scheduler")
+        logger.info(
+            f"Expiry scheduler started (interval={self.interval}s, batch_size={self.batch_size})"
+        )
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Expiry scheduler stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Expiry sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> dict[str, int]:
+        """Promote every expired, uncompleted task one level up"""
+        started = time.perf_counter()
+        now = datetime.now()
+        promoted = {}
+
+        # Go top-down so a task promoted in this sweep is never picked up twice
+        for level in ("todo", "task"):
+            promoted[level] = await self._promote_level(level, now)
+
+        total = sum(promoted.values())
+        self.sweeps += 1
+        self.total_promoted += total
+        self.last_sweep_at = now
+        self.last_sweep_ms = (time.perf_counter() - started) * 1000
+        self.last_promoted = promoted
+
+        if total:
+            logger.info(f"Expiry sweep promoted {total} tasks: {promoted}")
+            await audit_writer.write(
+                Log(
+                    username="system",
+                    endpoint="expiry_sweep",
+                    time=now,
+                    details={
+                        "promoted": promoted,
+                        "duration_ms": round(self.last_sweep_ms, 2),
+                    },
+                )
+            )
+        return promoted
+
+    async def _promote_level(self, level: str, now: datetime) -> int:
+        next_level = NEXT_LEVEL[level]
+        new_expired_date = now + LEVEL_DURATIONS[next_level]
+        promoted = 0
+
+        while True:
+            expired = (
+                await Task.find(
+                    Task.completed == False,
+                    Task.level == level,
+                    Task.expired_date <= now,
+                )
+                .limit(self.batch_size)
+                .project(TaskOwnerOnly)
+                .to_list()
+            )
+            if not expired:
+                break
+
+            # Repeat the filter so tasks changed since the read are left alone
+            result = await Task.find(
+                In(Task.id, [task.id for task in expired]),
+                Task.completed == False,
+                Task.level == level,
+                Task.expired_date <= now,
+            ).update_many(
+                Set({Task.level: next_level, Task.expired_date: new_expired_date})
+            )
+            promoted += result.modified_count
+            # Counts tasks found rather than modified; the reconciler fixes
+            # the rare task changed in between
+            moved = Counter(task.username for task in expired)
+            for username, count in moved.items():
+                task_cache.invalidate(username)
+                await task_counters.increment(
+                    username, {level: -count, next_level: count}
+                )
+
+            if len(expired) < self.batch_size:
+                break
+
+        return promoted
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "sweeps": self.sweeps,
+            "errors": self.errors,
+            "total_promoted": self.total_promoted,
+            "last_sweep_at": self.last_sweep_at,
+            "last_sweep_ms": round(self.last_sweep_ms, 2),
+            "last_promoted": self.last_promoted,
+        }
+
+
+expiry_scheduler = ExpiryScheduler()
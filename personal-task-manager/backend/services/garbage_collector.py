@@ -0,0 +1,354 @@
+# CASCADE DELETES AND ORPHAN COLLECTION
+#
+# Deleting a task leaves its File documents (with their binary data) behind,
+# and deleting a user leaves everything they owned. Delete endpoints enqueue a
+# cascade job instead, and a background worker started in main.lifespan
+# removes the dependents in throttled delete_many batches.
+#
+# Jobs only live in memory. A periodic sweep finds whatever a lost job (or an
+# older version of the app) left behind by reference: files of tasks that no
+# longer exist, descriptions without a task, transactions without an OFX file
+# and data of users that no longer exist. Referenced ids and usernames are
+# streamed from a $group aggregation LOOKUP_CHUNK at a time (distinct() returns
+# one document and fails past 16 MB). Sizes of deleted documents are summed
+# with $bsonSize and reported as reclaimed bytes.
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, NamedTuple
+
+from beanie import Document
+
+from models.file import File
+from models.log import Log
+from models.my_config import get_settings
+from models.ofx_file import OFXFile, Transaction
+from models.task import ArchivedTask, Task, TaskDescription
+from models.task_counters import TaskCounters
+from models.user import User
+from services.audit_writer import audit_writer
+from services.data_versions import data_versions
+
+logger = logging.getLogger(__name__)
+
+# Everything a user owns, dependents before what they depend on. Audit logs
+# go too; the admin's own delete_user log entry is kept.
+USER_DATA: list[type[Document]] = [
+    File,
+    TaskDescription,
+    Task,
+    ArchivedTask,
+    TaskCounters,
+    Transaction,
+    OFXFile,
+    Log,
+]
+
+# Checked for data of users that no longer exist by the sweep
+USER_OWNED: list[type[Document]] = [m for m in USER_DATA if m is not Log]
+
+LOOKUP_CHUNK = 1000
+
+
+class CascadeJob(NamedTuple):
+    kind: str  # "tasks" | "user"
+    username: str
+    task_ids: tuple = ()
+
+
+class GarbageCollector:
+    def __init__(
+        self,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        pause_ms: int = 100,
+        interval: float = 3600,
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.pause = pause_ms / 1000
+        self.interval = interval
+        self._queue: asyncio.Queue[CascadeJob] | None = None
+        self._worker: asyncio.Task | None = None
+        self._sweeper: asyncio.Task | None = None
+        # Users whose data is still being removed (sign-up waits for these)
+        self._pending_users: set[str] = set()
+
+        # Metrics
+        self.enqueued = 0
+        self.dropped = 0
+        self.jobs_done = 0
+        self.deleted: dict[str, int] = {}
+        self.reclaimed_bytes = 0
+        self.orphans: dict[str, int] = {}
+        self.sweeps = 0
+        self.errors = 0
+        self.last_sweep_at: datetime | None = None
+        self.last_sweep_ms = 0.0
+
+    async def start(self):
+        """Start the cascade worker and orphan sweeper (called from main.lifespan)"""
+        if self._worker:
+            return
+        settings = get_settings()
+        self.queue_size = settings.gc_queue_size
+        self.batch_size = settings.gc_batch_size
+        self.pause = settings.gc_batch_pause_ms / 1000
+        self.interval = settings.gc_sweep_interval_seconds
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker = asyncio.create_task(self._work(), name="gc-worker")
+        self._sweeper = asyncio.create_task(self._sweep_forever(), name="gc-sweeper")
+        logger.info(
+            f"Garbage collector started (batch_size={self.batch_size}, "
+            f"pause={self.pause}s, sweep_interval={self.interval}s)"
+        )
+
+    async def stop(self):
+        for task in (self._worker, self._sweeper):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self._queue and self._queue.qsize():
+            logger.info(
+                f"Garbage collector stopped with {self._queue.qsize()} jobs left for the next sweep"
+            )
+        self._worker = self._sweeper = self._queue = None
+        logger.info("Garbage collector stopped")
+
+    def delete_tasks(self, username: str, task_ids: list[Any]):
+        """Queue removal of what belongs to deleted tasks (their files)"""
+        if task_ids:
+            self._enqueue(CascadeJob("tasks", username, tuple(task_ids)))
+
+    def delete_user(self, username: str):
+        """Queue removal of everything a deleted user owned"""
+        self._pending_users.add(username)
+        self._enqueue(CascadeJob("user", username))
+
+    def is_pending(self, username: str) -> bool:
+        return username in self._pending_users
+
+    def _enqueue(self, job: CascadeJob):
+        if self._queue is None:
+            # Not running (e.g. scripts); the next sweep finds the orphans
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(job)
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"GC queue full, leaving {job.kind} job to the sweep")
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+                self.jobs_done += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"GC {job.kind} job for {job.username} failed: {str(e)}")
+            finally:
+                if job.kind == "user":
+                    self._pending_users.discard(job.username)
+
+    async def _run_job(self, job: CascadeJob):
+        if job.kind == "tasks":
+            for start in range(0, len(job.task_ids), LOOKUP_CHUNK):
+                chunk = list(job.task_ids[start : start + LOOKUP_CHUNK])
+                await self._delete_batches(
+                    File, {"task_id": {"$in": chunk}, "username": job.username}
+                )
+        elif job.kind == "user":
+            deleted = 0
+            for model in USER_DATA:
+                deleted += await self._delete_batches(model, {"username": job.username})
+            logger.info(f"Removed {deleted} documents of deleted user {job.username}")
+
+    async def _delete_batches(self, model: type[Document], query: dict) -> int:
+        """delete_many in batches of batch_size, pausing in between"""
+        collection = model.get_motor_collection()
+        name = model.get_collection_name()
+        deleted = 0
+        while True:
+            batch = await collection.aggregate(
+                [
+                    {"$match": query},
+                    {"$limit": self.batch_size},
+                    {
+                        "$project": {
+                            "username": 1,
+                            "bytes": {"$bsonSize": "$$ROOT"},
+                        }
+                    },
+                ]
+            ).to_list(None)
+            if not batch:
+                break
+
+            result = await collection.delete_many(
+                {"_id": {"$in": [document["_id"] for document in batch]}}
+            )
+            deleted += result.deleted_count
+            self.deleted[name] = self.deleted.get(name, 0) + result.deleted_count
+            self.reclaimed_bytes += sum(document["bytes"] for document in batch)
+            if model is File:
+                for username in {document.get("username") for document in batch}:
+                    data_versions.bump(username, "files")
+
+            if len(batch) < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+        return deleted
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"GC sweep failed: {str(e)}")
+
+    async def sweep(self) -> dict[str, int]:
+        """Find and remove orphans by reference"""
+        started = time.perf_counter()
+        found = {}
+
+        # Files of tasks that are gone (in neither tasks nor tasks_archive)
+        found["files"] = 0
+        async for task_ids in self._values(File, "task_id"):
+            missing = await self._missing(task_ids, [Task, ArchivedTask])
+            found["files"] += await self._delete_orphans(File, "task_id", missing)
+
+        # Out-of-line descriptions whose task is gone
+        found["task_descriptions"] = 0
+        async for description_ids in self._values(TaskDescription, "_id"):
+            missing = await self._missing(description_ids, [Task, ArchivedTask])
+            found["task_descriptions"] += await self._delete_orphans(
+                TaskDescription, "_id", missing
+            )
+
+        # Transactions of OFX files that are gone
+        found["transactions"] = 0
+        async for ofx_file_ids in self._values(Transaction, "ofx_file_id"):
+            missing = await self._missing(ofx_file_ids, [OFXFile])
+            found["transactions"] += await self._delete_orphans(
+                Transaction, "ofx_file_id", missing
+            )
+
+        # Data of users that are gone
+        gone = set()
+        for model in USER_OWNED:
+            async for usernames in self._values(model, "username"):
+                existing = {
+                    user["username"]
+                    for user in await User.get_motor_collection()
+                    .find({"username": {"$in": usernames}}, projection={"username": 1})
+                    .to_list(None)
+                }
+                gone.update(set(usernames) - existing - self._pending_users)
+        for username in gone:
+            self.delete_user(username)
+        found["users"] = len(gone)
+
+        for kind, count in found.items():
+            self.orphans[kind] = self.orphans.get(kind, 0) + count
+        self.sweeps += 1
+        self.last_sweep_at = datetime.now()
+        self.last_sweep_ms = (time.perf_counter() - started) * 1000
+
+        if any(found.values()):
+            logger.info(f"GC sweep found orphans: {found}")
+            await audit_writer.write(
+                Log(
+                    username="system",
+                    endpoint="gc_sweep",
+                    time=self.last_sweep_at,
+                    details={
+                        "orphans": found,
+                        "reclaimed_bytes": self.reclaimed_bytes,
+                        "duration_ms": round(self.last_sweep_ms, 2),
+                    },
+                )
+            )
+        return found
+
+    async def _values(
+        self, model: type[Document], field: str
+    ) -> AsyncIterator[list[Any]]:
+        """Distinct non-null values of field, LOOKUP_CHUNK at a time"""
+        collection = model.get_motor_collection()
+        if field == "_id":
+            cursor = collection.find({}, projection={"_id": 1}, batch_size=LOOKUP_CHUNK)
+        else:
+            cursor = collection.aggregate(
+                [
+                    {"$match": {field: {"$ne": None}}},
+                    {"$group": {"_id": f"${field}"}},
+                ],
+                allowDiskUse=True,
+                batchSize=LOOKUP_CHUNK,
+            )
+        chunk = []
+        async for document in cursor:
+            chunk.append(document["_id"])
+            if len(chunk) >= LOOKUP_CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    async def _missing(self, ids: list[Any], models: list[type[Document]]) -> list:
+        """The ids that exist in none of the given collections"""
+        missing = []
+        for start in range(0, len(ids), LOOKUP_CHUNK):
+            remaining = set(ids[start : start + LOOKUP_CHUNK])
+            # In order: the archiver inserts into tasks_archive before it
+            # deletes from tasks, so a task being moved is always found
+            for model in models:
+                if not remaining:
+                    break
+                found = (
+                    await model.get_motor_collection()
+                    .find({"_id": {"$in": list(remaining)}}, projection={"_id": 1})
+                    .to_list(None)
+                )
+                remaining -= {document["_id"] for document in found}
+            missing.extend(remaining)
+        return missing
+
+    async def _delete_orphans(
+        self, model: type[Document], field: str, ids: list[Any]
+    ) -> int:
+        deleted = 0
+        for start in range(0, len(ids), LOOKUP_CHUNK):
+            chunk = ids[start : start + LOOKUP_CHUNK]
+            deleted += await self._delete_batches(model, {field: {"$in": chunk}})
+        return deleted
+
+    def stats(self) -> dict:
+        return {
+            "running": self._worker is not None,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "jobs_done": self.jobs_done,
+            "pending_users": len(self._pending_users),
+            "deleted": self.deleted,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "orphans": self.orphans,
+            "sweeps": self.sweeps,
+            "errors": self.errors,
+            "last_sweep_at": self.last_sweep_at,
+            "last_sweep_ms": round(self.last_sweep_ms, 2),
+        }
+
+
+garbage_collector = GarbageCollector()
@@ -0,0 +1,144 @@
+# PASSWORD HASHING OFF THE EVENT LOOP
+#
+# bcrypt is deliberately slow (100-300 ms per hash or verify). Called inline
+# from sign_up / sign-in it froze the event loop for every other request.
+# Hashes now run on a dedicated thread pool (bcrypt releases the GIL while it
+# works) sized by password_hash_workers. At most password_hash_max_pending
+# calls may be running or waiting at once; beyond that callers get a 503
+# straight away instead of piling up behind a sign-in burst.
+#
+# The cost factor comes from bcrypt_rounds (see calibrate_bcrypt.py for picking
+# one). Hashes made with any other cost are replaced at the next sign-in.
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from models.my_config import get_settings
+
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["bcrypt"])
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = 4, max_pending: int = 64, rounds: int = 12):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._pending = 0
+
+        # Metrics
+        self.hashes = 0
+        self.verifies = 0
+        self.rehashed = 0
+        self.rejected = 0
+        self.peak_pending = 0
+        self.queue_ms = 0.0
+        self.max_queue_ms = 0.0
+        self.work_ms = 0.0
+
+    def start(self):
+        """Create the worker pool (called from main.lifespan)"""
+        if self._executor:
+            return
+        settings = get_settings()
+        self.workers = settings.password_hash_workers
+        self.max_pending = settings.password_hash_max_pending
+        self.rounds = settings.bcrypt_rounds
+        # Pinning min and max to the target makes needs_update flag any other cost
+        pwd_context.update(
+            bcrypt__default_rounds=self.rounds,
+            bcrypt__min_rounds=self.rounds,
+            bcrypt__max_rounds=self.rounds,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="password-hash"
+        )
+        self._slots = asyncio.Semaphore(self.workers)
+        logger.info(
+            f"Password hasher started (workers={self.workers}, "
+            f"max_pending={self.max_pending}, rounds={self.rounds})"
+        )
+
+    def stop(self):
+        if not self._executor:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = self._slots = None
+        logger.info("Password hasher stopped")
+
+    async def hash(self, password: str) -> str:
+        self.hashes += 1
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """Verify, and return a new hash if the stored one has another cost"""
+        self.verifies += 1
+        verified, new_hash = await self._run(
+            pwd_context.verify_and_update, password, hashed_password
+        )
+        if new_hash:
+            self.rehashed += 1
+        return verified, new_hash
+
+    async def _run(self, function: Callable, *args):
+        if self._executor is None:
+            # Not started (e.g. scripts); the default pool still keeps the loop free
+            return await asyncio.to_thread(function, *args)
+
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"Password hasher saturated ({self._pending} pending)")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in requests, try again in a moment.",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        self.peak_pending = max(self.peak_pending, self._pending)
+        queued = time.perf_counter()
+        try:
+            async with self._slots:
+                started = time.perf_counter()
+                waited = (started - queued) * 1000
+                self.queue_ms += waited
+                self.max_queue_ms = max(self.max_queue_ms, waited)
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, function, *args
+                )
+                self.work_ms += (time.perf_counter() - started) * 1000
+                return result
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        calls = self.hashes + self.verifies - self.rejected
+        return {
+            "running": self._executor is not None,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "rounds": self.rounds,
+            "pending": self._pending,
+            "peak_pending": self.peak_pending,
+            "hashes": self.hashes,
+            "verifies": self.verifies,
+            "rehashed": self.rehashed,
+            "rejected": self.rejected,
+            "avg_queue_ms": round(self.queue_ms / calls, 2) if calls else 0.0,
+            "max_queue_ms": round(self.max_queue_ms, 2),
+            "avg_work_ms": round(self.work_ms / calls, 2) if calls else 0.0,
+        }
+
+
+password_hasher = PasswordHasher()
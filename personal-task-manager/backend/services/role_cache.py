@@ -0,0 +1,74 @@
+# CACHED ROLE LOOKUPS FOR ADMIN CHECKS
+#
+# Admin endpoints used to load the caller's User document on every call just
+# to read its role. require_admin (auth/jwt_auth.py) asks this cache instead:
+# a small LRU/TTL map of username -> role, filled from the users collection on
+# a miss. update_user_role and delete_user invalidate the entry, so a demoted
+# or deleted admin loses access at once; the TTL bounds how long another
+# process can serve a stale role.
+
+import logging
+import time
+from collections import OrderedDict
+
+from models.my_config import get_settings
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class RoleCache:
+    def __init__(self, max_entries: int = 10000, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # username -> (expires_at, role or None for no such user)
+        self._entries: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def configure(self):
+        """Pick up size and TTL from MyConfig (called from main.lifespan)"""
+        settings = get_settings()
+        self.max_entries = settings.role_cache_max_entries
+        self.ttl = settings.role_cache_ttl_seconds
+
+    async def get(self, username: str) -> str | None:
+        """The user's current role, None if the user doesn't exist"""
+        entry = self._entries.get(username)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        user = await User.get_motor_collection().find_one(
+            {"username": username}, projection={"role": 1}
+        )
+        role = user.get("role") if user else None
+        self._entries[username] = (time.monotonic() + self.ttl, role)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return role
+
+    def invalidate(self, username: str):
+        if self._entries.pop(username, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+
+role_cache = RoleCache()
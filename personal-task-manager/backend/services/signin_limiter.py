@@ -0,0 +1,155 @@
+# SIGN-IN THROTTLING
+#
+# Every sign-in attempt costs a bcrypt verify, so a credential-stuffing burst
+# could eat all the hashing workers. login_for_access_token asks this limiter
+# first and answers 429 before touching the database or bcrypt.
+#
+# Failed attempts are counted in a sliding window per client IP and per
+# (username, client IP) pair. Once one of those reaches its limit it is blocked
+# with exponential backoff: base, 2x base, 4x base ... (capped) after each
+# further failure. Blocks never cover a username on its own, or anyone who
+# knows a username could lock its owner out; failures against a username from
+# all IPs only add a growing delay (capped) before the password is checked.
+# A success clears the (username, IP) failures. State lives in an LRU map
+# bounded by signin_limiter_max_entries, so a flood of random usernames can't
+# grow it.
+
+import logging
+import time
+from collections import OrderedDict, deque
+
+from models.my_config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Window:
+    __slots__ = ("failures", "blocked_until")
+
+    def __init__(self):
+        self.failures: deque[float] = deque()
+        self.blocked_until = 0.0
+
+
+class SignInLimiter:
+    def __init__(
+        self,
+        window: float = 900,
+        max_failures_per_user_ip: int = 5,
+        max_failures_per_ip: int = 50,
+        max_failures_per_user: int = 20,
+        backoff_base: float = 1,
+        backoff_max: float = 900,
+        user_delay_max: float = 5,
+        max_entries: int = 100000,
+    ):
+        self.window = window
+        # Failures before a key is blocked ("user" only ever delays)
+        self.limits = {
+            "user_ip": max_failures_per_user_ip,
+            "ip": max_failures_per_ip,
+            "user": max_failures_per_user,
+        }
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.user_delay_max = user_delay_max
+        self.max_entries = max_entries
+        # (kind, key) -> _Window, least recently used first
+        self._entries: OrderedDict[tuple[str, str], _Window] = OrderedDict()
+
+        # Metrics
+        self.allowed = 0
+        self.rejected = {"user_ip": 0, "ip": 0}
+        self.delayed = 0
+        self.failures = 0
+        self.evictions = 0
+
+    def configure(self):
+        """Pick up limits from MyConfig (called from main.lifespan)"""
+        settings = get_settings()
+        self.window = settings.signin_window_seconds
+        self.limits = {
+            "user_ip": settings.signin_max_failures_per_user_ip,
+            "ip": settings.signin_max_failures_per_ip,
+            "user": settings.signin_max_failures_per_user,
+        }
+        self.backoff_base = settings.signin_backoff_base_seconds
+        self.backoff_max = settings.signin_backoff_max_seconds
+        self.user_delay_max = settings.signin_user_delay_max_seconds
+        self.max_entries = settings.signin_limiter_max_entries
+
+    def check(self, username: str, ip: str | None) -> float:
+        """Seconds the caller has to wait, 0 if the attempt may go ahead"""
+        now = time.monotonic()
+        for kind, key in self._blocking_keys(username, ip):
+            entry = self._entries.get((kind, key))
+            if entry is not None and entry.blocked_until > now:
+                self.rejected[kind] += 1
+                return entry.blocked_until - now
+        self.allowed += 1
+        return 0.0
+
+    def delay(self, username: str) -> float:
+        """Seconds to hold an allowed attempt before checking the password"""
+        entry = self._entries.get(("user", username))
+        if entry is None:
+            return 0.0
+        self._expire(entry, time.monotonic())
+        over = len(entry.failures) - self.limits["user"]
+        if over < 0:
+            return 0.0
+        self.delayed += 1
+        return min(self.backoff_base * 2 ** min(over, 32), self.user_delay_max)
+
+    def failure(self, username: str, ip: str | None):
+        now = time.monotonic()
+        self.failures += 1
+        for kind, key in [*self._blocking_keys(username, ip), ("user", username)]:
+            entry = self._entry(kind, key)
+            self._expire(entry, now)
+            entry.failures.append(now)
+            over = len(entry.failures) - self.limits[kind]
+            if kind != "user" and over >= 0:
+                backoff = min(self.backoff_base * 2 ** min(over, 32), self.backoff_max)
+                entry.blocked_until = now + backoff
+            if over == 0:
+                logger.warning(f"Throttling sign-in for {kind} {key}")
+
+    def success(self, username: str, ip: str | None):
+        self._entries.pop(("user_ip", f"{username}|{ip}"), None)
+
+    def _blocking_keys(self, username: str, ip: str | None):
+        yield "user_ip", f"{username}|{ip}"
+        if ip:
+            yield "ip", ip
+
+    def _entry(self, kind: str, key: str) -> _Window:
+        entry = self._entries.get((kind, key))
+        if entry is None:
+            entry = self._entries[(kind, key)] = _Window()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end((kind, key))
+        return entry
+
+    def _expire(self, entry: _Window, now: float):
+        while entry.failures and entry.failures[0] <= now - self.window:
+            entry.failures.popleft()
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": self.window,
+            "limits": self.limits,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "delayed": self.delayed,
+            "failures": self.failures,
+            "evictions": self.evictions,
+        }
+
+
+signin_limiter = SignInLimiter()
@@ -0,0 +1,196 @@
+# COMPLETED TASK ARCHIVER
+#
+# Completed tasks pile up in the tasks collection next to the small set of
+# open ones. A background task started in main.lifespan moves tasks completed
+# more than archive_after_days ago into tasks_archive in batches, so the hot
+# collection and its indexes only hold recent work. /todos/completed reads
+# both collections; task writes that miss in tasks are applied to the archive,
+# and an archived task they un-complete is moved back with restore_reopened.
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from beanie.operators import In
+from pymongo.errors import BulkWriteError
+
+from models.log import Log
+from models.my_config import get_settings
+from models.task import ArchivedTask, Task, TaskOwnerOnly
+from services.audit_writer import audit_writer
+from services.task_cache import task_cache
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class TaskArchiver:
+    def __init__(
+        self,
+        archive_after_days: int = 30,
+        interval: float = 3600,
+        batch_size: int = 500,
+    ):
+        self.archive_after_days = archive_after_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+        # Metrics
+        self.sweeps = 0
+        self.errors = 0
+        self.total_archived = 0
+        self.total_restored = 0
+        self.last_sweep_at: datetime | None = None
+        self.last_sweep_ms = 0.0
+        self.last_archived = 0
+
+    async def start(self):
+        """Start the periodic archive sweep (called from main.lifespan)"""
+        if self._task:
+            return
+        settings = get_settings()
+        self.archive_after_days = settings.archive_after_days
+        self.interval = settings.archive_interval_seconds
+        self.batch_size = settings.archive_batch_size
+        self._task = asyncio.create_task(self._run(), name="task-archiver")
+        logger.info(
+            f"Task archiver started (after={self.archive_after_days}d, "
+            f"interval={self.interval}s, batch_size={self.batch_size})"
+        )
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Task archiver stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Archive sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> int:
+        """Move every task completed before the cutoff into tasks_archive"""
+        started = time.perf_counter()
+        now = datetime.now()
+        cutoff = now - timedelta(days=self.archive_after_days)
+        archived = 0
+
+        while True:
+            batch = (
+                await Task.find(Task.completed == True, Task.completed_date < cutoff)
+                .limit(self.batch_size)
+                .to_list()
+            )
+            if not batch:
+                break
+
+            await self._copy_to_archive(batch)
+            # Only remove what is still completed; a task reopened meanwhile stays
+            # hot and its archive copy is dropped again
+            ids = [task.id for task in batch]
+            result = await Task.find(In(Task.id, ids), Task.completed == True).delete()
+            if result.deleted_count < len(ids):
+                reopened = [
+                    task.id
+                    for task in await Task.find(In(Task.id, ids))
+                    .project(TaskOwnerOnly)
+                    .to_list()
+                ]
+                await ArchivedTask.find(In(ArchivedTask.id, reopened)).delete()
+            archived += result.deleted_count
+            for username in {task.username for task in batch}:
+                task_cache.invalidate(username)
+
+            if len(batch) < self.batch_size:
+                break
+
+        self.sweeps += 1
+        self.total_archived += archived
+        self.last_sweep_at = now
+        self.last_sweep_ms = (time.perf_counter() - started) * 1000
+        self.last_archived = archived
+
+        if archived:
+            logger.info(f"Archive sweep moved {archived} completed tasks")
+            await audit_writer.write(
+                Log(
+                    username="system",
+                    endpoint="archive_sweep",
+                    time=now,
+                    details={
+                        "archived": archived,
+                        "cutoff": cutoff.isoformat(),
+                        "duration_ms": round(self.last_sweep_ms, 2),
+                    },
+                )
+            )
+        return archived
+
+    async def restore_reopened(self, ids: list) -> int:
+        """Move archived tasks among ids that are no longer completed back to tasks.
+
+        Reopened tasks are never picked by a sweep, so the move can't race one.
+        """
+        documents = (
+            await ArchivedTask.get_motor_collection()
+            .find({"_id": {"$in": ids}, "completed": False})
+            .to_list(None)
+        )
+        if not documents:
+            return 0
+        # Insert before delete: the task is always in at least one collection
+        try:
+            await Task.get_motor_collection().insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+        restored = [document["_id"] for document in documents]
+        await ArchivedTask.get_motor_collection().delete_many(
+            {"_id": {"$in": restored}, "completed": False}
+        )
+        for username in {document["username"] for document in documents}:
+            task_cache.invalidate(username)
+        self.total_restored += len(restored)
+        return len(restored)
+
+    async def _copy_to_archive(self, batch: list[Task]):
+        documents = [ArchivedTask(**task.model_dump()) for task in batch]
+        try:
+            await ArchivedTask.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Copies left behind by an interrupted sweep are fine, anything else isn't
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "archive_after_days": self.archive_after_days,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "sweeps": self.sweeps,
+            "errors": self.errors,
+            "total_archived": self.total_archived,
+            "total_restored": self.total_restored,
+            "last_sweep_at": self.last_sweep_at,
+            "last_sweep_ms": round(self.last_sweep_ms, 2),
+            "last_archived": self.last_archived,
+        }
+
+
+task_archiver = TaskArchiver()
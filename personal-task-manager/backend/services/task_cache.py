@@ -0,0 +1,138 @@
+# PER-USER TASK LIST CACHE
+#
+# Read-through LRU/TTL cache for task list results, keyed by (username, view).
+# Entries remember the user's "tasks" data version they were filled under (see
+# services/data_versions.py) and are treated as a miss once task writes have
+# bumped it, so a single bump invalidates all of that user's views at once.
+# The cache is bounded by entry count and by the number of tasks (list items)
+# held across all entries, since one board holds up to 1,500 tasks and a page
+# 500. Callers keep large values out of it: task pages that carry
+# descriptions, and pages after the first, are never cached.
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from models.my_config import get_settings
+from services.data_versions import data_versions
+
+logger = logging.getLogger(__name__)
+
+
+class TaskListCache:
+    def __init__(
+        self, max_entries: int = 1000, max_items: int = 50000, ttl: float = 30
+    ):
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self.ttl = ttl
+        # (username, view) -> (version, expires_at, items, value), least
+        # recently used first
+        self._entries: OrderedDict[tuple[str, str], tuple[int, float, int, Any]] = (
+            OrderedDict()
+        )
+        self._items = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self):
+        """Pick up size and TTL from MyConfig (called from main.lifespan)"""
+        settings = get_settings()
+        self.max_entries = settings.task_cache_max_entries
+        self.max_items = settings.task_cache_max_items
+        self.ttl = settings.task_cache_ttl_seconds
+
+    def version(self, username: str) -> int:
+        return data_versions.get(username, "tasks")
+
+    def invalidate(self, username: str):
+        """Bump the user's task version so every cached view (and ETag) is stale"""
+        data_versions.bump(username, "tasks")
+        self.invalidations += 1
+
+    def get(self, username: str, view: str) -> Any | None:
+        key = (username, view)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        version, expires_at, _, value = entry
+        if version != self.version(username):
+            self.stale += 1
+        elif expires_at <= time.monotonic():
+            self.expired += 1
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self._remove(key)
+        self.misses += 1
+        return None
+
+    def set(self, username: str, view: str, value: Any, version: int):
+        """Store a value read under `version` (taken before the query ran)"""
+        if version != self.version(username):
+            # A write landed while we were reading; don't cache the old result
+            return
+        items = self._count_items(value)
+        if items > self.max_items:
+            return
+        key = (username, view)
+        self._remove(key)
+        self._entries[key] = (version, time.monotonic() + self.ttl, items, value)
+        self._items += items
+        while len(self._entries) > self.max_entries or self._items > self.max_items:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._items -= entry[2]
+
+    @staticmethod
+    def _count_items(value: Any) -> int:
+        """Tasks (or tags) in a cached result: the lengths of its lists"""
+        if isinstance(value, dict):
+            return max(1, sum(len(v) for v in value.values() if isinstance(v, list)))
+        return 1
+
+    async def get_or_load(
+        self, username: str, view: str, load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = self.get(username, view)
+        if value is not None:
+            return value
+        version = self.version(username)
+        value = await load()
+        self.set(username, view, value, version)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "items": self._items,
+            "max_items": self.max_items,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stale": self.stale,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+task_cache = TaskListCache()
@@ -0,0 +1,214 @@
+# PER-USER TASK COUNTERS
+#
+# Header badges (open tasks per level, high-priority count, completed this
+# week) are served from one small TaskCounters document per user instead of
+# counting task lists. The task write endpoints keep it current with $inc,
+# and a background reconciler started in main.lifespan recounts every user
+# periodically to correct any drift (concurrent writes, bulk updates, crashes
+# between a write and its $inc).
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+from models.my_config import get_settings
+from models.task import ArchivedTask, Task, TaskCountedOnly, TaskWithoutDescription
+from models.task_counters import TaskCounters
+
+logger = logging.getLogger(__name__)
+
+
+def week_key(day: datetime) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _counted(
+    task: Task | TaskWithoutDescription | TaskCountedOnly | None,
+) -> dict[str, int]:
+    """The counters a single task adds to"""
+    if task is None:
+        return {}
+    if task.completed:
+        return {f"completed_weeks.{week_key(task.completed_date)}": 1}
+    counts = {task.level: 1}
+    if task.high_priority:
+        counts["high_priority"] = 1
+    return counts
+
+
+class TaskCounterService:
+    def __init__(self, interval: float = 3600, batch_size: int = 500):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+        # Metrics
+        self.increments = 0
+        self.reconciles = 0
+        self.corrected = 0
+        self.sweeps = 0
+        self.errors = 0
+        self.last_sweep_at: datetime | None = None
+        self.last_sweep_ms = 0.0
+
+    async def start(self):
+        """Start the periodic reconciler (called from main.lifespan)"""
+        if self._task:
+            return
+        settings = get_settings()
+        self.interval = settings.task_counters_reconcile_interval_seconds
+        self.batch_size = settings.task_counters_reconcile_batch_size
+        self._task = asyncio.create_task(self._run(), name="task-counters")
+        logger.info(
+            f"Task counter reconciler started (interval={self.interval}s, batch_size={self.batch_size})"
+        )
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Task counter reconciler stopped")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reconcile_all()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Task counter reconcile failed: {str(e)}")
+
+    async def increment(self, username: str, changes: dict[str, int]):
+        changes = {field: n for field, n in changes.items() if n}
+        if not changes:
+            return
+        # No upsert: a user without counters gets a full count on first read
+        await TaskCounters.get_motor_collection().update_one(
+            {"username": username}, {"$inc": changes}
+        )
+        self.increments += 1
+
+    async def record(
+        self,
+        username: str,
+        before: Task | TaskWithoutDescription | TaskCountedOnly | None,
+        after: Task | TaskWithoutDescription | TaskCountedOnly | None,
+    ):
+        """Apply the change from one task write (before=None for a create,
+        after=None for a delete)"""
+        changes = _counted(after)
+        for field, n in _counted(before).items():
+            changes[field] = changes.get(field, 0) - n
+        await self.increment(username, changes)
+
+    async def get(self, username: str) -> TaskCounters:
+        counters = await TaskCounters.find_one(TaskCounters.username == username)
+        if counters is None:
+            counters = await self.reconcile(username)
+        return counters
+
+    async def reconcile(self, username: str) -> TaskCounters:
+        """Recount one user's tasks and overwrite their counters"""
+        now = datetime.now()
+        week_start = datetime.combine(
+            (now - timedelta(days=now.weekday())).date(), datetime.min.time()
+        )
+
+        fields = {"task": 0, "todo": 0, "gottado": 0, "high_priority": 0}
+        groups = await Task.aggregate(
+            [
+                {"$match": {"username": username, "completed": False}},
+                {
+                    "$group": {
+                        "_id": "$level",
+                        "count": {"$sum": 1},
+                        "high_priority": {"$sum": {"$cond": ["$high_priority", 1, 0]}},
+                    }
+                },
+            ]
+        ).to_list()
+        for group in groups:
+            if group["_id"] in fields:
+                fields[group["_id"]] = group["count"]
+            fields["high_priority"] += group["high_priority"]
+
+        completed = 0
+        for model in (Task, ArchivedTask):
+            completed += await model.find(
+                {
+                    "username": username,
+                    "completed": True,
+                    "completed_date": {"$gte": week_start},
+                }
+            ).count()
+        # Older weeks are dropped; only the current one is ever read
+        fields["completed_weeks"] = {week_key(now): completed}
+        fields["reconciled_at"] = now
+
+        previous = await TaskCounters.get_motor_collection().find_one_and_update(
+            {"username": username},
+            {"$set": fields},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        self.reconciles += 1
+        if previous is not None and any(
+            previous.get(field) != fields[field]
+            for field in ("task", "todo", "gottado", "high_priority")
+        ):
+            self.corrected += 1
+            logger.info(f"Corrected drifted task counters for {username}")
+        return TaskCounters(username=username, **fields)
+
+    async def reconcile_all(self) -> int:
+        """Recount every user that has a counters document"""
+        started = time.perf_counter()
+        reconciled = 0
+        last_id = None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            batch = (
+                await TaskCounters.get_motor_collection()
+                .find(query, projection={"username": 1})
+                .sort("_id", 1)
+                .limit(self.batch_size)
+                .to_list(None)
+            )
+            for counters in batch:
+                await self.reconcile(counters["username"])
+            reconciled += len(batch)
+            if len(batch) < self.batch_size:
+                break
+            last_id = batch[-1]["_id"]
+
+        self.sweeps += 1
+        self.last_sweep_at = datetime.now()
+        self.last_sweep_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Reconciled task counters for {reconciled} users")
+        return reconciled
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "increments": self.increments,
+            "reconciles": self.reconciles,
+            "corrected": self.corrected,
+            "sweeps": self.sweeps,
+            "errors": self.errors,
+            "last_sweep_at": self.last_sweep_at,
+            "last_sweep_ms": round(self.last_sweep_ms, 2),
+        }
+
+
+task_counters = TaskCounterService()
@@ -0,0 +1,137 @@
+# OUT-OF-LINE TASK DESCRIPTIONS
+#
+# A description can be up to a million characters. Kept inline, it is carried
+# by every read and rewrite of its task document. Descriptions larger than
+# description_inline_max_bytes are zlib-compressed into task_descriptions
+# instead (same _id as the task); the task keeps description_external=True
+# and, as its description, the first description_search_excerpt_bytes so the
+# text index (/todos/search) still covers the start of large descriptions.
+# The full text is only fetched and decompressed when a caller asks for the
+# description (GET /todos/{id}, ?fields=description).
+
+import asyncio
+import logging
+import time
+import zlib
+from typing import Any, NamedTuple
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+
+from models.my_config import get_settings
+from models.task import TaskDescription
+
+logger = logging.getLogger(__name__)
+
+
+class EncodedDescription(NamedTuple):
+    task_fields: dict  # what to set on the task document
+    data: bytes | None  # compressed description, None when it stays inline
+    size: int
+
+
+class TaskDescriptionStore:
+    def __init__(
+        self, inline_max_bytes: int = 16384, level: int = 6, excerpt_bytes: int = 8192
+    ):
+        self.inline_max_bytes = inline_max_bytes
+        self.level = level
+        self.excerpt_bytes = excerpt_bytes
+
+        # Metrics
+        self.stored_inline = 0
+        self.stored_external = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.loads = 0
+        self.load_ms = 0.0
+
+    def configure(self):
+        """Pick up the threshold and zlib level from MyConfig (called from main.lifespan)"""
+        settings = get_settings()
+        self.inline_max_bytes = settings.description_inline_max_bytes
+        self.level = settings.description_compression_level
+        self.excerpt_bytes = min(
+            settings.description_search_excerpt_bytes, self.inline_max_bytes
+        )
+
+    async def encode(self, description: str) -> EncodedDescription:
+        raw = description.encode()
+        if len(raw) <= self.inline_max_bytes:
+            self.stored_inline += 1
+            return EncodedDescription(
+                {"description": description, "description_external": False},
+                None,
+                len(raw),
+            )
+
+        # Compressing a megabyte takes a few ms, keep it off the event loop
+        data = await asyncio.to_thread(zlib.compress, raw, self.level)
+        self.stored_external += 1
+        self.bytes_in += len(raw)
+        self.bytes_out += len(data)
+        # Cut on a byte budget; "ignore" drops a character split in half
+        excerpt = raw[: self.excerpt_bytes].decode(errors="ignore")
+        return EncodedDescription(
+            {"description": excerpt, "description_external": True}, data, len(raw)
+        )
+
+    async def save(
+        self, task_id: PydanticObjectId, username: str, encoded: EncodedDescription
+    ):
+        """Store (or drop) the side document once the task write has succeeded"""
+        collection = TaskDescription.get_motor_collection()
+        if encoded.data is None:
+            await collection.delete_one({"_id": task_id})
+            return
+        await collection.replace_one(
+            {"_id": task_id},
+            {"username": username, "data": encoded.data, "size": encoded.size},
+            upsert=True,
+        )
+
+    async def delete(self, task_ids: list[PydanticObjectId]):
+        if task_ids:
+            await TaskDescription.find(In(TaskDescription.id, task_ids)).delete()
+
+    async def hydrate(self, tasks: list[Any]):
+        """Fill in description for tasks that keep it out of line"""
+        external = [
+            task for task in tasks if getattr(task, "description_external", False)
+        ]
+        if not external:
+            return
+
+        started = time.perf_counter()
+        stored = {
+            document.id: document
+            for document in await TaskDescription.find(
+                In(TaskDescription.id, [task.id for task in external])
+            ).to_list()
+        }
+        for task in external:
+            document = stored.get(task.id)
+            if document is None:
+                logger.warning(f"Description of task {task.id} is missing")
+                continue
+            raw = await asyncio.to_thread(zlib.decompress, document.data)
+            task.description = raw.decode()
+        self.loads += len(external)
+        self.load_ms += (time.perf_counter() - started) * 1000
+
+    def stats(self) -> dict:
+        return {
+            "inline_max_bytes": self.inline_max_bytes,
+            "level": self.level,
+            "excerpt_bytes": self.excerpt_bytes,
+            "stored_inline": self.stored_inline,
+            "stored_external": self.stored_external,
+            "compression_ratio": (
+                round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None
+            ),
+            "loads": self.loads,
+            "avg_load_ms": round(self.load_ms / self.loads, 2) if self.loads else 0.0,
+        }
+
+
+task_descriptions = TaskDescriptionStore()
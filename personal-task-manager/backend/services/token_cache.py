@@ -0,0 +1,76 @@
+# VERIFIED ACCESS TOKEN CACHE
+#
+# Every authenticated request used to re-verify the JWT signature and rebuild
+# TokenData. get_user (auth/jwt_auth.py) now looks the token up here first:
+# a bounded LRU map from the token's SHA-256 digest (the raw token is never
+# kept) to its verified TokenData, held until the token's own exp. It is only
+# used from the event loop (get_user is async), so it takes no lock.
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from models.my_config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        # digest -> (exp as a unix timestamp, TokenData), least recently used first
+        self._entries: OrderedDict[bytes, tuple[float, Any]] = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def configure(self):
+        """Pick up the size from MyConfig (called from main.lifespan)"""
+        self.max_entries = get_settings().token_cache_max_entries
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Any | None:
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, token: str, exp: float, token_data: Any):
+        key = self.digest(token)
+        self._entries[key] = (exp, token_data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+token_cache = TokenCache()
@@ -0,0 +1,151 @@
+# TOKEN DENY-LIST
+#
+# Logout and refresh-token rotation revoke tokens by id (jti) or by session
+# family (every token issued from one sign-in). Revocations are stored in
+# revoked_tokens, where a TTL index drops them once the tokens they cover
+# have expired, and mirrored into an in-memory dict so get_user checks them
+# in O(1) without a read per request.
+#
+# The mirror is loaded in full at startup; after that a background task
+# started in main.lifespan only fetches entries revoked since its last sync
+# (so revocations made by other processes arrive within one interval).
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from models.my_config import get_settings
+from models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Re-read this far back on each sync, for writers with slightly skewed clocks
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class TokenDenyList:
+    def __init__(self, interval: float = 5):
+        self.interval = interval
+        # jti or family -> unix timestamp after which it no longer matters
+        self._denied: dict[str, float] = {}
+        self._synced_until: datetime | None = None
+        self._task: asyncio.Task | None = None
+
+        # Metrics
+        self.revoked = 0
+        self.checks = 0
+        self.denied_hits = 0
+        self.syncs = 0
+        self.synced_entries = 0
+        self.pruned = 0
+        self.errors = 0
+        self.last_sync_ms = 0.0
+
+    async def start(self):
+        """Load the deny-list and start the incremental sync (called from main.lifespan)"""
+        if self._task:
+            return
+        self.interval = get_settings().token_denylist_sync_seconds
+        await self.sync()
+        self._task = asyncio.create_task(self._run(), name="token-denylist")
+        logger.info(
+            f"Token deny-list started ({len(self._denied)} entries, interval={self.interval}s)"
+        )
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Token deny-list stopped")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Token deny-list sync failed: {str(e)}")
+
+    def is_revoked(self, *ids: str | None) -> bool:
+        self.checks += 1
+        for token_id in ids:
+            if token_id and token_id in self._denied:
+                self.denied_hits += 1
+                return True
+        return False
+
+    async def revoke(self, token_id: str, username: str, expires_at: datetime) -> bool:
+        """Deny a jti or family until expires_at (when its tokens expire anyway).
+
+        Returns False if it was already revoked, by this or another process.
+        """
+        self._denied[token_id] = expires_at.timestamp()
+        try:
+            await RevokedToken(
+                jti=token_id,
+                username=username,
+                revoked_at=datetime.now(timezone.utc),
+                expires_at=expires_at,
+            ).insert()
+        except DuplicateKeyError:
+            return False
+        self.revoked += 1
+        return True
+
+    async def sync(self):
+        started = time.perf_counter()
+        query = {}
+        if self._synced_until is not None:
+            query["revoked_at"] = {"$gte": self._synced_until - SYNC_OVERLAP}
+        now = datetime.now(timezone.utc)
+
+        entries = (
+            await RevokedToken.get_motor_collection()
+            .find(query, projection={"jti": 1, "expires_at": 1})
+            .to_list(None)
+        )
+        for entry in entries:
+            expires_at = entry["expires_at"]
+            if expires_at.tzinfo is None:
+                # Mongo hands back naive UTC datetimes
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            self._denied[entry["jti"]] = expires_at.timestamp()
+        self._synced_until = now
+
+        # Expired entries can't match a token that get_user would accept
+        cutoff = time.time()
+        expired = [key for key, until in self._denied.items() if until <= cutoff]
+        for key in expired:
+            del self._denied[key]
+
+        self.syncs += 1
+        self.synced_entries += len(entries)
+        self.pruned += len(expired)
+        self.last_sync_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "entries": len(self._denied),
+            "revoked": self.revoked,
+            "checks": self.checks,
+            "denied": self.denied_hits,
+            "syncs": self.syncs,
+            "synced_entries": self.synced_entries,
+            "pruned": self.pruned,
+            "errors": self.errors,
+            "last_sync_ms": round(self.last_sync_ms, 2),
+        }
+
+
+token_denylist = TokenDenyList()
@@ -62,7 +62,9 @@ export function TodoTable({ tasks = [], onTaskUpdate, onMoveItem }) {
 
 function TaskPopover({ task, onUpdate, index, isFirst, isLast, onMoveUp, onMoveDown }) {
     const [title, setTitle] = useState(task.title);
-    const [description, setDescription] = useState(task.description);
+    // Lists come without descriptions; the full task is loaded when the dialog opens
+    const [description, setDescription] = useState(task.description ?? "");
+    const [savedDescription, setSavedDescription] = useState(task.description ?? "");
     const [level, setLevel] = useState(task.level);
     const [dueDate, setDueDate] = useState(new Date(task.expired_date));
     const [isEditing, setIsEditing] = useState(false);
@@ -99,6 +101,27 @@ function TaskPopover({ task, onUpdate, index, isFirst, isLast, onMoveUp, onMoveD
         }
     };
 
+    // Fetch the full task (with description) when dialog opens
+    const fetchTaskDetail = async () => {
+        try {
+            const response = await fetch(`http://127.0.0.1:8000/todos/${task._id}`, {
+                method: "GET",
+                headers: {
+                    Authorization: `Bearer ${localStorage.getItem("token")}`,
+                },
+            });
+
+            if (response.ok) {
+                const detail = await response.json();
+                setDescription(detail.description);
+                setSavedDescription(detail.description);
+            }
+        } catch (error) {
+            console.error("Error fetching task details:", error);
+            showNotification("Failed to load task details");
+        }
+    };
+
     const handleSave = async () => {
         try {
             // Update title if changed
@@ -118,7 +141,7 @@ function TaskPopover({ task, onUpdate, index, isFirst, isLast, onMoveUp, onMoveD
             }
 
             // Update description if changed
-            if (description !== task.description) {
+            if (description !== savedDescription) {
                 const descResponse = await fetch(`http://127.0.0.1:8000/todos/desc/${task._id}`, {
                     method: "PATCH",
                     headers: {
@@ -131,6 +154,7 @@ function TaskPopover({ task, onUpdate, index, isFirst, isLast, onMoveUp, onMoveD
                 if (!descResponse.ok) {
                     throw new Error("Failed to update description");
                 }
+                setSavedDescription(description);
             }
 
             // Update level if changed
@@ -268,7 +292,10 @@ function TaskPopover({ task, onUpdate, index, isFirst, isLast, onMoveUp, onMoveD
     return (
         <Dialog
             onOpenChange={(open) => {
-                if (open) fetchTaskFiles();
+                if (open) {
+                    fetchTaskDetail();
+                    fetchTaskFiles();
+                }
             }}
         >
             <DialogTrigger asChild>
@@ -287,7 +314,7 @@ function TaskPopover({ task, onUpdate, index, isFirst, isLast, onMoveUp, onMoveD
                         {isEditing ? (
                             <Textarea id="description" value={description} onChange={(e) => setDescription(e.target.value)} className="min-h-[100px]" />
                         ) : (
-                            <p className="whitespace-pre-wrap text-sm text-muted-foreground">{task.description || "No description provided."}</p>
+                            <p className="whitespace-pre-wrap text-sm text-muted-foreground">{savedDescription || "No description provided."}</p>
                         )}
                     </div>
 
@@ -66,6 +66,27 @@ const setupExpirationTimer = (token, router) => {
     }, redirectTime);
 };
 
+// Every open task of one level, soonest expiry first like the board. Streamed
+// as NDJSON, so the list isn't capped at one page.
+const fetchLevel = async (path, headers) => {
+    const response = await fetch(`http://127.0.0.1:8000/todos/${path}`, {
+        headers: { ...headers, Accept: "application/x-ndjson" },
+    });
+    if (!response.ok) {
+        throw new Error(`Error fetching ${path}: ${response.statusText}`);
+    }
+    const text = await response.text();
+    return text
+        .split("\n")
+        .filter((line) => line)
+        .map((line) => JSON.parse(line))
+        .sort(
+            (a, b) =>
+                a.expired_date.localeCompare(b.expired_date) ||
+                a._id.localeCompare(b._id)
+        );
+};
+
 const geistSans = Geist({
     variable: "--font-geist-sans",
     subsets: ["latin"],
@@ -109,70 +130,43 @@ export default function Home() {
                 "Content-Type": "application/json",
             };
 
-            // All tasks
-            const allResponse = await fetch("http://127.0.0.1:8000/todos/all", {
-                headers,
-            });
+            // Whole board (tasks, todos and gottados) in a single request
+            const boardResponse = await fetch(
+                "http://127.0.0.1:8000/todos/board",
+                { headers }
+            );
 
-            if (!allResponse.ok) {
+            if (!boardResponse.ok) {
                 // If unauthorized, redirect to login
-                if (allResponse.status === 401) {
+                if (boardResponse.status === 401) {
                     localStorage.removeItem("token");
                     router.push("/");
                     return;
                 }
                 throw new Error(
-                    `Error fetching tasks: ${allResponse.statusText}`
+                    `Error fetching tasks: ${boardResponse.statusText}`
                 );
             }
 
-            const allData = await allResponse.json();
-            setAllTasks(allData);
+            // Each bucket comes back sorted by due date
+            const boardData = await boardResponse.json();
 
-            // Tasks
-            const tasksResponse = await fetch(
-                "http://127.0.0.1:8000/todos/tasks",
-                { headers }
-            );
-            const tasksData = await tasksResponse.json();
-            // Sort tasks by due date
-            const sortedTasks = [...tasksData].sort((a, b) => {
-                if (!a.expired_date && !b.expired_date) return 0;
-                if (!a.expired_date) return 1;
-                if (!b.expired_date) return -1;
-                return new Date(a.expired_date) - new Date(b.expired_date);
-            });
-            setTasks(sortedTasks);
-
-            // Todos
-            const todosResponse = await fetch(
-                "http://127.0.0.1:8000/todos/todos",
-                { headers }
-            );
-            const todosData = await todosResponse.json();
-            // Sort todos by due date
-            const sortedTodos = [...todosData].sort((a, b) => {
-                if (!a.expired_date && !b.expired_date) return 0;
-                if (!a.expired_date) return 1;
-                if (!b.expired_date) return -1;
-                return new Date(a.expired_date) - new Date(b.expired_date);
-            });
-            setTodos(sortedTodos);
-
-            // Gottados
-            const gottadosResponse = await fetch(
-                "http://127.0.0.1:8000/todos/gottados",
-                { headers }
-            );
-            const gottadosData = await gottadosResponse.json();
-            // Sort gottados by due date
-            const sortedGottados = [...gottadosData].sort((a, b) => {
-                if (!a.expired_date && !b.expired_date) return 0;
-                if (!a.expired_date) return 1;
-                if (!b.expired_date) return -1;
-                return new Date(a.expired_date) - new Date(b.expired_date);
-            });
-            setGottados(sortedGottados);
+            // The board holds at most 100 tasks per level; load the whole of
+            // any level that has more
+            const levels = { task: "tasks", todo: "todos", gottado: "gottados" };
+            for (const [level, key] of Object.entries(levels)) {
+                if (boardData.counts[level] > boardData[key].length) {
+                    boardData[key] = await fetchLevel(key, headers);
+                }
+            }
+            setAllTasks([
+                ...boardData.tasks,
+                ...boardData.todos,
+                ...boardData.gottados,
+            ]);
+            setTasks(boardData.tasks);
+            setTodos(boardData.todos);
+            setGottados(boardData.gottados);
         } catch (error) {
             console.error("Error fetching tasks:", error);
             setError(error.message);